@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+import weakref
+
+from payoff_engine import calculate_debt_payoff
+from rag_pipeline import get_context, get_prompt, get_response_cache, render_prompt, retrieve_docs
+from response_cache import model_name
+from tracing import span
+
+# ======================
+# ⚡ Async Serving Pipeline
+# ======================
+# Awaitable versions of retrieval and answering for serving many sessions
+# from one process. Retrieval (embedding forward pass + memory-mapped search,
+# both GIL-releasing) runs on worker threads over the pooled Mongo client; the
+# LLM call goes through the model's native async client. Semaphores cap how
+# many of each are in flight so a burst of users queues instead of piling up.
+
+RETRIEVAL_CONCURRENCY = int(os.getenv("RETRIEVAL_CONCURRENCY", 4))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 16))
+
+_semaphores = weakref.WeakKeyDictionary()  # event loop -> (retrieval, llm)
+
+
+def get_semaphores():
+    # asyncio primitives belong to one event loop; Streamlit starts a new one per asyncio.run
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = (asyncio.Semaphore(RETRIEVAL_CONCURRENCY), asyncio.Semaphore(LLM_CONCURRENCY))
+    return _semaphores[loop]
+
+
+async def aretrieve_docs(query, top_k=3):
+    retrieval, _ = get_semaphores()
+    async with retrieval:
+        return await asyncio.to_thread(retrieve_docs, query, top_k)
+
+
+async def aanswer_query(documents, model, query, use_cache=True):
+    from langchain_core.messages import AIMessage
+
+    context = await asyncio.to_thread(get_context, documents)
+    prompt = get_prompt()
+    cache = get_response_cache() if use_cache else None
+
+    rendered = await asyncio.to_thread(render_prompt, query, context)
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, model_name(model), rendered, documents, query)
+        if cached is not None:
+            return AIMessage(content=cached, response_metadata={"cached": True})
+
+    _, llm = get_semaphores()
+    chain = prompt | model
+    async with llm:
+        started = time.perf_counter()
+        with span("llm.invoke"):
+            response = await chain.ainvoke({"question": query, "context": context})
+        latency = time.perf_counter() - started
+    if cache is not None:
+        await asyncio.to_thread(cache.set, model_name(model), rendered, documents,
+                                response.content, latency, query)
+    return response
+
+
+async def aprepare_battle_plan(debts, strategy, available_emi, stress_level, query):
+    """Runs both payoff simulations alongside retrieval.
+
+    Returns (min_battle, current_battle, retrieved_docs).
+    """
+    min_emi = sum(d['min_emi'] for d in debts)
+    return await asyncio.gather(
+        asyncio.to_thread(calculate_debt_payoff, debts, strategy, min_emi, stress_level),
+        asyncio.to_thread(calculate_debt_payoff, debts, strategy, available_emi, stress_level),
+        aretrieve_docs(query),
+    )
+
+
+async def aanswer_battle_plan(debts, strategy, available_emi, stress_level, query, model, use_cache=True):
+    """The whole battle plan for one session: simulations, retrieval, then the LLM answer."""
+    min_battle, current_battle, documents = await aprepare_battle_plan(
+        debts, strategy, available_emi, stress_level, query
+    )
+    response = await aanswer_query(documents, model, query, use_cache)
+    return min_battle, current_battle, response
@@ -0,0 +1,182 @@
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+
+from payoff_engine import calculate_debt_payoff, select_strategy
+
+# ======================
+# 📦 Batch Portfolio Scoring
+# ======================
+# Scores exported customer portfolios without Streamlit. Portfolios stream in
+# from JSONL (one per line) or Parquet (record batches), are scored in chunks
+# across a process pool and are written out in input order, JSONL or
+# Parquet, as each chunk lands. Only a few chunks per worker are ever in
+# flight, so memory stays flat however large the export is.
+#
+# One portfolio:
+#   {"id": "c-123", "emi": 2500, "motivation": "Quick Strikes", "stress": "Calm",
+#    "debts": [{"name": "Card", "balance": 1500, "apr": 22.0, "min_emi": 45}, ...]}
+#
+# `motivation` and `stress` default to the form's defaults; a `strategy`
+# skips `select_strategy`. A portfolio that can't be scored gets an `error`
+# instead of failing the run.
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", os.cpu_count() or 1))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 500))  # Portfolios per pool task
+PENDING_CHUNKS_PER_WORKER = 2  # Chunks queued ahead of each worker
+PROGRESS_SECONDS = 10.0
+DEFAULT_MOTIVATION = "Quick Strikes"
+DEFAULT_STRESS = "Panic"
+
+RESULT_FIELDS = (
+    "id", "strategy", "months", "total_interest", "converged", "first_payoff_month",
+    "min_emi_months", "min_emi_interest", "interest_saved", "diverging_debts", "error"
+)
+
+
+def score_portfolio(record):
+    """The battle plan summary for one portfolio, as a flat RESULT_FIELDS dict."""
+    result = dict.fromkeys(RESULT_FIELDS)
+    try:
+        result['id'] = record.get('id')
+        debts, stress = record['debts'], record.get('stress') or DEFAULT_STRESS
+        strategy = record.get('strategy') or select_strategy(
+            debts, record.get('motivation') or DEFAULT_MOTIVATION, stress
+        )
+        min_battle = calculate_debt_payoff(debts, strategy, sum(d['min_emi'] for d in debts), stress)
+        current_battle = calculate_debt_payoff(debts, strategy, record['emi'], stress)
+    except (AttributeError, KeyError, TypeError, ValueError, ZeroDivisionError) as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+    result.update(
+        strategy=strategy,
+        months=current_battle['months'],
+        total_interest=current_battle['total_interest'],
+        converged=current_battle['converged'],
+        first_payoff_month=current_battle['first_payoff_month'],
+        min_emi_months=min_battle['months'],
+        min_emi_interest=min_battle['total_interest'],
+        interest_saved=min_battle['total_interest'] - current_battle['total_interest'],
+        diverging_debts=current_battle['diverging_debts']
+    )
+    return result
+
+
+def _score_chunk(records):
+    return [score_portfolio(record) for record in records]
+
+
+def iter_scored_chunks(records, workers=BATCH_WORKERS, chunk_size=BATCH_CHUNK_SIZE):
+    """Yields scored chunks of `records`, in input order.
+
+    Chunks are handed to the pool as earlier ones come back, never more than
+    PENDING_CHUNKS_PER_WORKER per worker ahead, so `records` is read lazily.
+    """
+    records = iter(records)
+    chunks = iter(lambda: list(itertools.islice(records, chunk_size)), [])
+    if workers <= 1:
+        for chunk in chunks:
+            yield _score_chunk(chunk)
+        return
+
+    # Spawn rather than fork, as for PDF parsing
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_score_chunk, (chunk,)))
+            if len(pending) >= workers * PENDING_CHUNKS_PER_WORKER:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def read_portfolios(path, batch_size=BATCH_CHUNK_SIZE):
+    """Streams portfolio dicts from a .parquet file or a JSONL file."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: {e}") from e
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, results):
+        self.file.writelines(json.dumps(result) + "\n" for result in results)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Appends each chunk of results as a row group; ids are stored as strings."""
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        # Explicit, so a first chunk of all-null columns can't fix the wrong types
+        self.schema = pa.schema([
+            ("id", pa.string()), ("strategy", pa.string()), ("months", pa.int64()),
+            ("total_interest", pa.float64()), ("converged", pa.bool_()), ("first_payoff_month", pa.int64()),
+            ("min_emi_months", pa.int64()), ("min_emi_interest", pa.float64()),
+            ("interest_saved", pa.float64()), ("diverging_debts", pa.list_(pa.string())), ("error", pa.string())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, results):
+        rows = [dict(result, id=None if result['id'] is None else str(result['id'])) for result in results]
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def score_file(input_path, output_path, workers=BATCH_WORKERS, chunk_size=BATCH_CHUNK_SIZE):
+    """Scores every portfolio in `input_path` into `output_path` (.parquet, else JSONL)."""
+    writer = ParquetWriter(output_path) if output_path.endswith(".parquet") else JsonlWriter(output_path)
+    stats = {"scored": 0, "errors": 0, "seconds": 0.0}
+    started = reported = time.perf_counter()
+    try:
+        for results in iter_scored_chunks(read_portfolios(input_path, chunk_size), workers, chunk_size):
+            writer.write(results)
+            stats["scored"] += len(results)
+            stats["errors"] += sum(result['error'] is not None for result in results)
+            if time.perf_counter() - reported > PROGRESS_SECONDS:
+                reported = time.perf_counter()
+                print(f"📦 {stats['scored']:,} portfolios scored "
+                      f"({stats['scored'] / (reported - started):,.0f} portfolios/sec)")
+    finally:
+        writer.close()
+    stats["seconds"] = time.perf_counter() - started
+    print(f"✅ Scored {stats['scored']:,} portfolios ({stats['errors']:,} errors) into {output_path} "
+          f"in {stats['seconds']:.1f}s: {stats['scored'] / max(stats['seconds'], 1e-9):,.0f} portfolios/sec "
+          f"({workers} workers, chunks of {chunk_size})")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score exported debt portfolios without the Streamlit app.")
+    parser.add_argument("input", help="portfolios, .jsonl or .parquet")
+    parser.add_argument("output", help="results, .jsonl or .parquet")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="scoring processes")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE, help="portfolios per pool task")
+    args = parser.parse_args()
+    score_file(args.input, args.output, args.workers, args.chunk_size)
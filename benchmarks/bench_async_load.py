@@ -0,0 +1,115 @@
+"""Battle-plan throughput: one request at a time versus the async pipeline under load.
+
+Runs offline. A stub chat model answers after a fixed delay (sleeping on the
+event loop when awaited), a stub embedding model hashes the query after a
+short GIL-releasing pause like a forward pass, and the in-process NumPy
+vector store stands in for the embedding store. Every request carries a distinct
+portfolio so no cache short-circuits the work. Run from the repository root:
+    python benchmarks/bench_async_load.py 64 0.2
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import async_pipeline
+import rag_pipeline
+from bench_payoff import make_portfolio
+from payoff_engine import calculate_debt_payoff
+from vector_store import NumpyVectorStore
+
+DIM = 384
+CORPUS_SIZE = 5_000
+EMBED_SECONDS = 0.01
+
+
+class StubChatModel(BaseChatModel):
+    latency: float = 0.2
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Pay the card first."))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Pay the card first."))])
+
+
+class StubEmbeddings:
+    def embed_query(self, text):
+        time.sleep(EMBED_SECONDS)
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+def in_memory_store(size, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((size, DIM), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    store = NumpyVectorStore(DIM)
+    store.add([f"{row:024d}" for row in range(size)], matrix, [f"chunk {row}" for row in range(size)])
+    return store
+
+
+def requests(count, num_debts=6):
+    for n in range(count):
+        debts = make_portfolio(num_debts, seed=n)
+        yield debts, sum(d['min_emi'] for d in debts) * 1.5, f"Portfolio {n}: {debts}"
+
+
+def serial(batch, model):
+    for debts, emi, query in batch:
+        min_emi = sum(d['min_emi'] for d in debts)
+        calculate_debt_payoff(debts, "Avalanche Assault", min_emi, "Calm")
+        calculate_debt_payoff(debts, "Avalanche Assault", emi, "Calm")
+        documents = rag_pipeline.retrieve_docs(query)
+        rag_pipeline.answer_query(documents, model, query, use_cache=False)
+
+
+async def concurrent(batch, model):
+    await asyncio.gather(*(
+        async_pipeline.aanswer_battle_plan(debts, "Avalanche Assault", emi, "Calm", query, model, use_cache=False)
+        for debts, emi, query in batch
+    ))
+
+
+def main(count, latency):
+    store, embeddings = in_memory_store(CORPUS_SIZE), StubEmbeddings()
+    rag_pipeline.get_retriever = lambda: store
+    rag_pipeline.get_embedding_model = lambda: embeddings
+    rag_pipeline.RETRIEVAL_MODE = "dense"  # The lexical index lives beside the on-disk store
+    rag_pipeline.chunk_metadata = lambda chunk_ids: {}  # No Mongo: chunks just don't merge
+    model = StubChatModel(latency=latency)
+
+    started = time.perf_counter()
+    serial(list(requests(count)), model)
+    serial_seconds = time.perf_counter() - started
+
+    # Fresh query-cache keys, so the async run redoes the retrieval work
+    batch = [(debts, emi, query + " (async)") for debts, emi, query in requests(count)]
+    started = time.perf_counter()
+    asyncio.run(concurrent(batch, model))
+    async_seconds = time.perf_counter() - started
+
+    print(f"{count} battle plans, {latency * 1000:.0f} ms LLM latency, "
+          f"retrieval x{async_pipeline.RETRIEVAL_CONCURRENCY}, LLM x{async_pipeline.LLM_CONCURRENCY}")
+    print(f"{'serial':>8}: {count / serial_seconds:8.1f} plans/sec")
+    print(f"{'async':>8}: {count / async_seconds:8.1f} plans/sec ({serial_seconds / async_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 64, float(sys.argv[2]) if len(sys.argv) > 2 else 0.2)
@@ -0,0 +1,78 @@
+"""Batch scoring throughput: JSONL and Parquet exports, one process versus the pool.
+
+Writes a synthetic export of mixed 1-10 debt portfolios (a few of them
+malformed) to a temporary directory, scores it end to end through
+`score_file` and checks every portfolio comes back, in order. Run from the
+repository root:
+    python benchmarks/bench_batch.py 20000
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from batch_scoring import BATCH_WORKERS, read_portfolios, score_file
+from bench_payoff import make_portfolio
+from payoff_engine import calculate_debt_payoff_reference, select_strategy
+
+REFERENCE_SAMPLE = 300
+
+
+def export(count, seed=0):
+    rng = random.Random(seed)
+    for n in range(count):
+        debts = make_portfolio(rng.randint(1, 10), seed=n)
+        record = {
+            "id": f"c-{n}",
+            "emi": round(sum(d['min_emi'] for d in debts) * rng.uniform(1.0, 1.6)),
+            "motivation": rng.choice(["Quick Strikes", "Long Campaign"]),
+            "stress": rng.choice(["Calm", "Tense", "Panic"]),
+            "debts": debts
+        }
+        if n % 1000 == 999:
+            del record["emi"]  # Malformed rows are reported, not fatal
+        yield record
+
+
+def reference_rate(path):
+    """Portfolios/sec of the original month-by-month calculator, on a sample."""
+    records = [r for r, _ in zip(read_portfolios(path), range(REFERENCE_SAMPLE)) if "emi" in r]
+    started = time.perf_counter()
+    for r in records:
+        strategy = select_strategy(r["debts"], r["motivation"], r["stress"])
+        calculate_debt_payoff_reference(r["debts"], strategy, sum(d['min_emi'] for d in r["debts"]), r["stress"])
+        calculate_debt_payoff_reference(r["debts"], strategy, r["emi"], r["stress"])
+    return len(records) / (time.perf_counter() - started)
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as directory:
+        jsonl = os.path.join(directory, "portfolios.jsonl")
+        with open(jsonl, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in export(count))
+        parquet = os.path.join(directory, "portfolios.parquet")
+        pq.write_table(pa.Table.from_pylist(list(read_portfolios(jsonl))), parquet)
+
+        print(f"{count:,} portfolios; original loop: {reference_rate(jsonl):,.0f} portfolios/sec")
+        for source in (jsonl, parquet):
+            for workers in sorted({1, BATCH_WORKERS}):
+                output = os.path.join(directory, f"scores-{workers}{os.path.splitext(source)[1]}")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    stats = score_file(source, output, workers=workers)
+                ids = [r["id"] for r in read_portfolios(output)]
+                assert ids == [f"c-{n}" for n in range(count)], "portfolios lost or reordered"
+                print(f"{os.path.basename(source):>20} -> {os.path.basename(output):<18} {workers:>2} workers: "
+                      f"{stats['scored'] / stats['seconds']:>8,.0f} portfolios/sec ({stats['errors']} errors)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,63 @@
+"""Context tokens sent to the LLM: retrieved chunks joined verbatim versus the context budget.
+
+Runs offline. Synthetic pages are split by `create_chunks` (so neighbours
+overlap exactly as ingested ones do), and each "retrieval" returns a run of
+neighbouring chunks plus a copy of one from a second PDF. Run from the
+repository root:
+    python benchmarks/bench_context_budget.py 200 6
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+
+from context_budget import CONTEXT_TOKEN_BUDGET, assemble_context, count_tokens
+from pdf_loader import create_chunks
+
+WORDS = ("debt interest rate balance payment avalanche snowball credit card loan minimum month "
+         "principal household income budget strategy savings lender").split()
+
+
+def synthetic_page(rng, sentences=60):
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def retrievals(count, top_k, seed=0):
+    rng = random.Random(seed)
+    for n in range(count):
+        page = Document(page_content=synthetic_page(rng), metadata={"source": f"doc{n}.pdf", "page": 0})
+        chunks = create_chunks([page])
+        start = rng.randrange(max(len(chunks) - top_k, 1))
+        hits = chunks[start:start + top_k - 1]
+        # The same passage saved in another PDF
+        copy = Document(page_content=hits[0].page_content, metadata={**hits[0].metadata, "source": "copy.pdf"})
+        yield hits + [copy]
+
+
+def main(count, top_k):
+    batch = list(retrievals(count, top_k))
+    raw = sum(count_tokens("\n\n".join(d.page_content for d in documents)) for documents in batch)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence the per-call token log
+        contexts = [assemble_context(documents) for documents in batch]
+    elapsed = time.perf_counter() - started
+    budgeted = sum(count_tokens(context) for context in contexts)
+
+    print(f"{count} retrievals of {top_k} chunks, budget {CONTEXT_TOKEN_BUDGET} tokens")
+    print(f"{'verbatim':>10}: {raw / count:8.0f} tokens/request")
+    print(f"{'budgeted':>10}: {budgeted / count:8.0f} tokens/request ({1 - budgeted / raw:.0%} fewer), "
+          f"{elapsed / count * 1000:.2f} ms to assemble")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, int(sys.argv[2]) if len(sys.argv) > 2 else 6)
@@ -0,0 +1,40 @@
+"""Chunks/sec of the embedding stage for different batch sizes, on the bundled PDFs.
+
+Run from the repository root:
+    python benchmarks/bench_embedding.py 16 32 64 128
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from pdf_loader import iter_chunked_files, list_pdfs
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def main(batch_sizes):
+    started = time.perf_counter()
+    texts = [c.page_content for _, chunks in iter_chunked_files(list_pdfs("pdfs/")) for c in chunks]
+    print(f"Parsed {len(texts)} chunks in {time.perf_counter() - started:.1f}s")
+
+    model = HuggingFaceEmbeddings(model_name=MODEL_NAME)
+    started = time.perf_counter()
+    for text in texts:
+        model.embed_query(text)
+    one_by_one = len(texts) / (time.perf_counter() - started)
+    print(f"{'one at a time':>14}: {one_by_one:8.1f} chunks/sec")
+
+    for batch_size in batch_sizes:
+        model = HuggingFaceEmbeddings(model_name=MODEL_NAME, encode_kwargs={"batch_size": batch_size})
+        started = time.perf_counter()
+        model.embed_documents(texts)
+        rate = len(texts) / (time.perf_counter() - started)
+        print(f"{'batch ' + str(batch_size):>14}: {rate:8.1f} chunks/sec ({rate / one_by_one:.1f}x)")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [16, 32, 64, 128])
@@ -0,0 +1,82 @@
+"""Dense-only versus hybrid (BM25 + dense, RRF) retrieval on the bundled PDFs.
+
+Each sampled chunk becomes two queries: its first sentence, and the app's
+advisor prompt followed by the chunk's three most distinctive terms, which
+is how exact terms like "APR" reach retrieval from the frontend. A hit means
+the source chunk came back in the top k. Uses the real embedding model.
+Run from the repository root:
+    python benchmarks/bench_hybrid.py 100
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_store import EmbeddingStore, EmbeddingStoreWriter
+from lexical_index import get_lexical_index, hybrid_search, tokenize
+from pdf_loader import iter_chunked_files, list_pdfs
+from vector_database import chunk_id, get_embedding_model
+from vector_store import MmapVectorStore
+
+TOP_K = 3
+PROMPT = ("You are a professional debt management advisor. Generate a concise and clear debt repayment "
+          "strategy based on the following financial context: ")
+
+
+def distinctive_terms(index, text, count=3):
+    """The chunk's terms with the highest tf-idf."""
+    tokens = tokenize(text)
+    df = {t: index.offsets[index.vocab[t] + 1] - index.offsets[index.vocab[t]] for t in set(tokens)}
+    return sorted(df, key=lambda t: -tokens.count(t) * np.log(index.size / df[t]))[:count]
+
+
+def evaluate(search, queries):
+    hits, reciprocal_ranks, timings = 0, [], []
+    for query, target in queries:
+        started = time.perf_counter()
+        found = [hit[0] for hit in search(query)]
+        timings.append(time.perf_counter() - started)
+        hits += target in found[:TOP_K]
+        reciprocal_ranks.append(1 / (found.index(target) + 1) if target in found else 0.0)
+    timings = np.array(timings) * 1000
+    return hits / len(queries), np.mean(reciprocal_ranks), np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def main(num_chunks):
+    chunks = [c for _, file_chunks in iter_chunked_files(list_pdfs("pdfs/")) for c in file_chunks]
+    texts = [c.page_content for c in chunks]
+    ids = [chunk_id(c.metadata.get("source", ""), c.page_content) for c in chunks]
+    model = get_embedding_model()
+    with tempfile.TemporaryDirectory() as directory:
+        EmbeddingStoreWriter(directory).append(ids, model.embed_documents(texts), texts)
+        store = EmbeddingStore(directory)
+        vector_store = MmapVectorStore(store)
+        index = get_lexical_index(store)
+
+        rng = random.Random(0)
+        sample = rng.sample(range(len(chunks)), min(num_chunks, len(chunks)))
+        query_sets = {
+            "sentence": [(re.split(r"(?<=[.!?])\s", texts[n])[0], ids[n]) for n in sample],
+            "prompt+terms": [(PROMPT + " ".join(distinctive_terms(index, texts[n])), ids[n]) for n in sample],
+        }
+        print(f"{len(chunks)} chunks, {len(sample)} queries per set")
+        print(f"{'queries':>13} {'retrieval':>9} {'hit@' + str(TOP_K):>6} {'MRR':>6} {'p50 ms':>7} {'p99 ms':>7}")
+        for name, queries in query_sets.items():
+            vectors = {query: model.embed_query(query) for query, _ in queries}  # Not part of the timing
+            searches = {
+                "dense": lambda q: vector_store.search(vectors[q], 10),
+                "hybrid": lambda q: hybrid_search(vector_store, store, q, vectors[q], 10),
+            }
+            for retrieval, search in searches.items():
+                hit, mrr, p50, p99 = evaluate(search, queries)
+                print(f"{name:>13} {retrieval:>9} {hit:>6.2f} {mrr:>6.2f} {p50:>7.2f} {p99:>7.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
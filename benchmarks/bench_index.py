@@ -0,0 +1,91 @@
+"""Query latency of the memory-mapped exact scan versus the HNSW graph, on synthetic corpora.
+
+Run from the repository root (sizes are optional):
+    python benchmarks/bench_index.py 10000 100000 1000000
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_store import EmbeddingStore, EmbeddingStoreWriter
+from vector_index import VectorIndex, sync_index
+
+DIM = 384  # all-MiniLM-L6-v2
+NUM_QUERIES = 200
+TOP_K = 3
+WRITE_BATCH = 50_000
+
+
+def synthetic_corpus(size, seed=0):
+    """Clustered unit vectors, closer to real sentence embeddings than pure noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(size // 100, 1), DIM), dtype=np.float32)
+    vectors = centers[rng.integers(len(centers), size=size)]
+    vectors += 0.5 * rng.standard_normal((size, DIM), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def synthetic_queries(vectors, seed=1):
+    """Perturbed corpus vectors, like questions that land near stored chunks."""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(len(vectors), size=NUM_QUERIES)]
+    return picks + 0.02 * rng.standard_normal((NUM_QUERIES, DIM), dtype=np.float32)
+
+
+def write_store(directory, vectors):
+    writer = EmbeddingStoreWriter(directory)
+    for start in range(0, len(vectors), WRITE_BATCH):
+        block = vectors[start:start + WRITE_BATCH]
+        ids = [f"{i:024x}" for i in range(start, start + len(block))]
+        writer.append(ids, block, [f"chunk {i}" for i in range(start, start + len(block))])
+
+
+def percentiles(timings):
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def main(sizes):
+    print(f"{'chunks':>9} {'open ms':>8} {'build s':>8} {'scan p50':>9} {'scan p99':>9} "
+          f"{'hnsw p50':>9} {'hnsw p99':>9} {'recall@3':>9}")
+    for size in sizes:
+        vectors = synthetic_corpus(size)
+        queries = synthetic_queries(vectors)
+        with tempfile.TemporaryDirectory() as directory:
+            write_store(directory, vectors)
+            del vectors
+
+            start = time.perf_counter()
+            store = EmbeddingStore(directory)
+            cold_open = time.perf_counter() - start
+
+            start = time.perf_counter()
+            index = VectorIndex.create(DIM)
+            sync_index(index, store)
+            build = time.perf_counter() - start
+
+            scan_times, index_times, hits = [], [], 0
+            for query in queries:
+                start = time.perf_counter()
+                exact = store.search(query, TOP_K)
+                scan_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                found = index.search(query, TOP_K)
+                index_times.append(time.perf_counter() - start)
+                hits += len({row for row, _ in exact} & {row for row, _ in found})
+
+        scan_p50, scan_p99 = percentiles(scan_times)
+        index_p50, index_p99 = percentiles(index_times)
+        print(f"{size:>9} {cold_open * 1000:>8.2f} {build:>8.1f} {scan_p50:>7.2f}ms {scan_p99:>7.2f}ms "
+              f"{index_p50:>7.2f}ms {index_p99:>7.2f}ms {hits / (NUM_QUERIES * TOP_K):>9.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,58 @@
+"""Attack-order optimizer: search time and savings over the best fixed strategy.
+
+Each portfolio is optimized for total interest and for months, with and
+without a "first payoff within N months" constraint; every result is the
+exact engine's. Run from the repository root:
+    python benchmarks/bench_optimizer.py 5
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_payoff import make_portfolio
+from payoff_optimizer import optimize_order
+
+INTERACTIVE_MS = 200
+SCORE_KEYS = {"interest": "total_interest", "months": "months"}
+
+
+def run(debts, emi, objective, first_payoff_within=None):
+    best = optimize_order(debts, emi, "Calm", objective, first_payoff_within)
+    key = SCORE_KEYS[objective]
+    # Only fixed strategies that meet the constraint themselves are fair baselines
+    baseline = min(result[key] for result in best['baselines'].values()
+                   if first_payoff_within is None or result['first_payoff_month'] <= first_payoff_within)
+    return best['seconds'] * 1000, 1 - best['result'][key] / baseline, best['exhaustive']
+
+
+def main(portfolios):
+    print(f"{'debts':>6} {'objective':<10} {'constraint':<11} {'worst ms':>9} {'mean gain':>10} {'best gain':>10} "
+          f"{'exhaustive':>11}")
+    slowest = 0.0
+    for num_debts in (3, 5, 8, 12, 16, 20):
+        for objective in SCORE_KEYS:
+            for constrained in (False, True):
+                timings, gains, exhaustive = [], [], 0
+                for seed in range(portfolios):
+                    debts = make_portfolio(num_debts, seed=seed)
+                    emi = sum(d['min_emi'] for d in debts) * 1.3
+                    # A first win at least as soon as the quickest fixed strategy delivers one
+                    within = None
+                    if constrained:
+                        quickest = optimize_order(debts, emi, "Calm", objective, budget_ms=0)['baselines']
+                        within = min(r['first_payoff_month'] for r in quickest.values())
+                    ms, gain, done = run(debts, emi, objective, within)
+                    timings.append(ms)
+                    gains.append(gain)
+                    exhaustive += done
+                slowest = max(slowest, max(timings))
+                print(f"{num_debts:>6} {objective:<10} {'first win' if constrained else '-':<11} "
+                      f"{max(timings):>9.1f} {sum(gains) / len(gains):>10.1%} {max(gains):>10.1%} "
+                      f"{exhaustive:>5}/{portfolios}")
+    print(f"Slowest search: {slowest:.1f} ms ({'within' if slowest < INTERACTIVE_MS else 'over'} "
+          f"the {INTERACTIVE_MS} ms interactive budget)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,106 @@
+"""Compares the event-driven payoff engine against the original dict loop.
+
+Run from the repository root:
+    python benchmarks/bench_payoff.py
+"""
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payoff_engine import calculate_debt_payoff, calculate_debt_payoff_reference
+
+STRATEGIES = ["Avalanche Assault", "Snowball Charge", "Hybrid Strategy"]
+
+
+def make_portfolio(num_debts, seed=0):
+    """Long-tenor portfolio whose minimum EMIs barely cover interest."""
+    rng = random.Random(seed)
+    debts = []
+    for i in range(num_debts):
+        balance = rng.randint(5_000, 300_000)
+        apr = round(rng.uniform(3, 24), 1)
+        min_emi = int(balance * apr / 1200 * rng.uniform(1.05, 1.5)) + 1
+        debts.append({"name": f"Debt {i+1}", "balance": balance, "apr": apr, "min_emi": min_emi})
+    return debts
+
+
+def assert_matches(actual, expected):
+    """Same months, payoff events and order; interest equal up to rounding."""
+    assert actual['months'] == expected['months'], "engine diverged from the reference loop"
+    events = lambda result: [(step['month'], step['paid_debts']) for step in result['payoff_plan']]
+    assert events(actual) == events(expected), "engine diverged from the reference loop"
+    for name, tracker in expected['debt_tracker'].items():
+        assert actual['debt_tracker'][name]['paid_month'] == tracker['paid_month']
+        assert math.isclose(actual['debt_tracker'][name]['total_interest'], tracker['total_interest'],
+                            rel_tol=1e-6, abs_tol=1e-6)
+    assert math.isclose(actual['total_interest'], expected['total_interest'], rel_tol=1e-6, abs_tol=1e-6)
+
+
+def best_of(func, repeat, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    print(f"{'debts':>6} {'strategy':<18} {'months':>7} {'loop ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for num_debts in (1, 10, 100):
+        debts = make_portfolio(num_debts)
+        emi = sum(d["min_emi"] for d in debts) * 1.02
+        for strategy in STRATEGIES:
+            loop_time, expected = best_of(calculate_debt_payoff_reference, 3, debts, strategy, emi, "Panic")
+            engine_time, actual = best_of(calculate_debt_payoff, 3, debts, strategy, emi, "Panic")
+            assert_matches(actual, expected)
+            print(f"{num_debts:>6} {strategy:<18} {actual['months']:>7} "
+                  f"{loop_time * 1000:>10.1f} {engine_time * 1000:>10.1f} {loop_time / engine_time:>7.1f}x")
+
+    # A minimum that covers only part of the interest: the loop creeps down 0.01 a month
+    debts = make_portfolio(3, seed=1)
+    debts[0]["min_emi"] = round(debts[0]["balance"] * debts[0]["apr"] / 1200 * 0.99, 2)
+    emi = sum(d["min_emi"] for d in debts)
+    loop_time, expected = best_of(calculate_debt_payoff_reference, 1, debts, "Avalanche Assault", emi, "Panic")
+    engine_time, actual = best_of(calculate_debt_payoff, 3, debts, "Avalanche Assault", emi, "Panic")
+    # Tens of thousands of 0.01 steps accumulate rounding in the loop, so allow a month either way
+    assert abs(actual["months"] - expected["months"]) <= 1, "engine diverged from the reference loop"
+    assert math.isclose(actual["total_interest"], expected["total_interest"], rel_tol=1e-6)
+    print(f"\nDiverging: {', '.join(actual['diverging_debts'])} runs {actual['months']} months; "
+          f"loop {loop_time * 1000:.1f} ms, engine {engine_time * 1000:.1f} ms "
+          f"({loop_time / engine_time:.0f}x)")
+
+    # Minimums at or near the interest: constant balances, and debts that creep down onto
+    # the balance whose interest equals the minimum and amortize from there
+    card = {"name": "Card A", "balance": 1200, "apr": 18, "min_emi": 15}
+    edge_cases = [
+        ([card, {"name": "Loan", "balance": 8000, "apr": 9, "min_emi": 50}], 65),
+        ([card], 15),
+        ([dict(card, balance=1200.005)], 15),
+        ([dict(card, balance=1000), {"name": "Loan", "balance": 5000, "apr": 6, "min_emi": 100}], 165),
+        ([{"name": "Card", "balance": 2400, "apr": 24, "min_emi": 48},
+          {"name": "Store", "balance": 900, "apr": 12, "min_emi": 9},
+          {"name": "Car", "balance": 12000, "apr": 6, "min_emi": 250}], 320),
+    ]
+    for debts, emi in edge_cases:
+        for strategy in STRATEGIES:
+            assert_matches(calculate_debt_payoff(debts, strategy, emi, "Panic"),
+                           calculate_debt_payoff_reference(debts, strategy, emi, "Panic"))
+    print(f"Interest-only and creeping minimums: {len(edge_cases) * len(STRATEGIES)} runs match the loop")
+
+    # Minimums a few rupees over the interest on balances that take a century to clear
+    debts = [{"name": f"Debt {i+1}", "balance": balance, "apr": apr, "min_emi": min_emi}
+             for i, (balance, apr, min_emi) in enumerate([(6248, 21.7, 143), (17113, 27.7, 414), (19580, 17.5, 127),
+                                                          (16269, 27.0, 342), (7091, 17.9, 66)])]
+    result = calculate_debt_payoff(debts, "Avalanche Assault", 1092, "Panic")
+    assert result["converged"] and 0 < result["total_interest"] < math.inf, "engine lost precision"
+    assert all(tracker["total_interest"] >= 0 for tracker in result["debt_tracker"].values()), "engine lost precision"
+    print(f"Near-level portfolio: {result['months']} months, {result['total_interest']:,.0f} interest")
+
+
+if __name__ == "__main__":
+    main()
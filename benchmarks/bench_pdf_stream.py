@@ -0,0 +1,43 @@
+"""Peak RSS of streaming PDF chunking as the corpus grows.
+
+Each run links N copies of the bundled PDFs into a temporary directory and
+drains `iter_chunked_pages` in a fresh process, so the reported peaks are
+per run. Run from the repository root:
+    python benchmarks/bench_pdf_stream.py 1 4 16
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DRAIN = """
+import resource, sys
+sys.path.insert(0, {root!r})
+from pdf_loader import iter_chunked_pages, list_pdfs
+chunks = sum(len(c) for _, c in iter_chunked_pages(list_pdfs({directory!r}), workers={workers}) if c)
+parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+print(chunks, parent, workers)
+"""
+
+
+def main(copies_list, workers=2):
+    pdfs = [f for f in os.listdir(os.path.join(ROOT, "pdfs")) if f.endswith(".pdf")]
+    print(f"{'PDFs':>6} {'chunks':>8} {'parent MB':>10} {'worker MB':>10}")
+    for copies in copies_list:
+        with tempfile.TemporaryDirectory() as directory:
+            for n in range(copies):
+                for name in pdfs:
+                    os.symlink(os.path.join(ROOT, "pdfs", name), os.path.join(directory, f"{n}-{name}"))
+            out = subprocess.run(
+                [sys.executable, "-c", DRAIN.format(root=ROOT, directory=directory, workers=workers)],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+        chunks, parent, child = (int(x) for x in out)
+        print(f"{copies * len(pdfs):>6} {chunks:>8} {parent / 1024:>10.0f} {child / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 4, 16])
@@ -0,0 +1,104 @@
+"""Stage latencies of the whole pipeline, from PDF ingestion to a streamed answer.
+
+Runs offline and reproducibly: mongomock stands in for MongoDB, a hashing
+embedding model for MiniLM (vectors depend only on the text) and a stub chat
+model, streaming a fixed answer, for Groq. The bundled PDFs are ingested
+into a temporary directory, then each battle plan makes the frontend's calls
+for a seeded portfolio and asks a question about it. The stage table comes
+from `tracing`; the JSON snapshot is written to the optional path, for CI to
+diff between runs. mongomock is not in requirements.txt; without it the
+benchmark says so and exits. Run from the repository root:
+    python benchmarks/bench_pipeline.py 20 trace.json
+"""
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+try:
+    import mongomock
+except ImportError:
+    print("⏭️ Skipping: the pipeline benchmark needs mongomock to stand in for MongoDB (pip install mongomock).")
+    sys.exit(0)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import rag_pipeline
+import tracing
+import vector_database
+from bench_async_load import DIM, StubChatModel
+from bench_payoff import make_portfolio
+from payoff_engine import calculate_debt_payoff, emi_sweep, select_strategy
+from payoff_optimizer import optimize_order
+from stress_simulator import simulate_stress
+
+STRESS_PATHS = 2_000
+
+
+class HashEmbeddings:
+    """Deterministic unit vectors seeded by the text, like a model with no latency."""
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(DIM)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def battle_plan(n):
+    debts = make_portfolio(4 + n % 5, seed=n)
+    emi = sum(d['min_emi'] for d in debts) * 1.4
+    stress = ("Calm", "Tense", "Panic")[n % 3]
+    strategy = select_strategy(debts, ("Quick Strikes", "Long Campaign")[n % 2], stress)
+    calculate_debt_payoff(debts, strategy, sum(d['min_emi'] for d in debts), stress)
+    calculate_debt_payoff(debts, strategy, emi, stress)
+    emi_sweep(debts, emi, stress)
+    optimize_order(debts, emi, stress)
+    simulate_stress(debts, strategy, emi, stress, paths=STRESS_PATHS, workers=1, seed=n)
+
+    query = f"Which debt should I pay first? Portfolio {n}: {debts}"
+    documents = rag_pipeline.retrieve_docs(query)
+    for _ in rag_pipeline.stream_answer_query(documents, StubChatModel(latency=0.0), query, use_cache=False):
+        pass
+
+
+def main(plans, output=None):
+    client = mongomock.MongoClient()
+    vector_database.get_client = lambda: client
+    vector_database.get_embedding_model = rag_pipeline.get_embedding_model = lambda *args, **kwargs: HashEmbeddings()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)  # The embedding store and manifest are relative paths
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            vector_database.ingest_directory(os.path.join(ROOT, "pdfs"), workers=1)
+        print(f"Ingested {client[vector_database.DATABASE_NAME][vector_database.COLLECTION_NAME].count_documents({})} "
+              f"chunks in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for n in range(plans):
+                battle_plan(n)
+        print(f"{plans} battle plans in {time.perf_counter() - started:.1f}s\n")
+
+        os.chdir(ROOT)
+        snapshot = tracing.export_json(output)
+
+    print(f"{'stage':<20} {'calls':>6} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for stage, stats in snapshot["stages"].items():
+        print(f"{stage:<20} {stats['count']:>6} {stats['total_ms']:>10.1f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}")
+    if output:
+        print(f"\nWrote {output}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,56 @@
+"""Cost of a "Generate Battle Plan" rerun: recomputing the payoff work versus a plan cache hit.
+
+Runs offline. The plan is built from the same calls the frontend makes
+(retrieval and the LLM answer have caches of their own and are left out).
+Run from the repository root:
+    python benchmarks/bench_plan_cache.py 6
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_payoff import make_portfolio
+from payoff_engine import calculate_debt_payoff, emi_sweep
+from payoff_optimizer import optimize_order
+from plan_cache import PlanCache, plan_key
+from stress_simulator import simulate_stress
+
+STRATEGY, STRESS = "Avalanche Assault", "Tense"
+
+
+def build_plan(debts, emi):
+    return {
+        "min_battle": calculate_debt_payoff(debts, STRATEGY, sum(d['min_emi'] for d in debts), STRESS),
+        "current_battle": calculate_debt_payoff(debts, STRATEGY, emi, STRESS),
+        "stress_test": simulate_stress(debts, STRATEGY, emi, STRESS),
+        "emi_sweep": emi_sweep(debts, emi, STRESS),
+        "best_order": optimize_order(debts, emi, STRESS)
+    }
+
+
+def main(num_debts, reruns=20):
+    debts = make_portfolio(num_debts)
+    emi = sum(d['min_emi'] for d in debts) * 1.3
+    cache = PlanCache()
+
+    # First click: nothing cached yet
+    started = time.perf_counter()
+    cache.set(plan_key(debts, emi, STRATEGY, STRESS), build_plan(debts, emi))
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(reruns):
+        # A rerun rebuilds the inputs from widgets, so the key is recomputed from fresh dicts
+        plan = cache.get(plan_key([dict(d) for d in debts], emi, STRATEGY, STRESS))
+        assert plan is not None, "a rerun missed the plan cache"
+    cached_seconds = (time.perf_counter() - started) / reruns
+
+    print(f"{num_debts} debts, {reruns} reruns, {cache.stats}")
+    print(f"{'recompute':>10}: {build_seconds * 1000:10.1f} ms/rerun")
+    print(f"{'cache hit':>10}: {cached_seconds * 1000:10.3f} ms/rerun")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 6)
@@ -0,0 +1,73 @@
+"""Memory versus recall@k for quantized scoring with full-precision re-rank.
+
+Each corpus is written as a float32 and a float16 store; int8 and PQ codes
+are built over the float32 one and searched with several shortlist sizes.
+"MB" is what has to stay hot in RAM to score a query: the whole matrix for
+exact scans, only the codes (plus codebook) otherwise. Run from the
+repository root:
+    python benchmarks/bench_quantization.py 20000 200000
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_index import TOP_K, synthetic_corpus, synthetic_queries, write_store
+from embedding_store import EmbeddingStore, EmbeddingStoreWriter
+from quantization import build_codes, rerank_search, sync_codes
+
+SHORTLISTS = (TOP_K, 20, 100)
+
+
+def write_float16_store(directory, vectors):
+    writer = EmbeddingStoreWriter(directory, "float16")
+    writer.append([f"{i:024x}" for i in range(len(vectors))], vectors, [""] * len(vectors))
+
+
+def measure(search, queries, exact):
+    found, timings = [], []
+    for query in queries:
+        started = time.perf_counter()
+        found.append({row for row, _ in search(query)})
+        timings.append(time.perf_counter() - started)
+    recall = np.mean([len(f & e) / TOP_K for f, e in zip(found, exact)])
+    return recall, 1000 * np.median(timings)
+
+
+def report(size, name, megabytes, baseline, recall, p50):
+    print(f"{size:>9} {name:>16} {megabytes:>8.1f} {baseline / megabytes:>6.1f}x {recall:>9.3f} {p50:>8.2f}")
+
+
+def main(sizes):
+    print(f"{'chunks':>9} {'scoring':>16} {'MB':>8} {'saved':>7} {'recall@' + str(TOP_K):>9} {'p50 ms':>8}")
+    for size in sizes:
+        vectors = synthetic_corpus(size)
+        queries = synthetic_queries(vectors)
+        with tempfile.TemporaryDirectory() as full_dir, tempfile.TemporaryDirectory() as half_dir:
+            write_store(full_dir, vectors)
+            write_float16_store(half_dir, vectors)
+            del vectors
+            store, half = EmbeddingStore(full_dir), EmbeddingStore(half_dir)
+            exact = [{row for row, _ in store.search(query, TOP_K)} for query in queries]
+            baseline = store.matrix.nbytes / 2**20
+
+            recall, p50 = measure(lambda q: store.search(q, TOP_K), queries, exact)
+            report(size, "float32 exact", baseline, baseline, recall, p50)
+            recall, p50 = measure(lambda q: half.search(q, TOP_K), queries, exact)
+            report(size, "float16 exact", half.matrix.nbytes / 2**20, baseline, recall, p50)
+
+            for kind in ("int8", "pq"):
+                codes = build_codes(kind, store)
+                sync_codes(codes, store)
+                for shortlist in SHORTLISTS:
+                    recall, p50 = measure(lambda q: rerank_search(codes, store, q, TOP_K, shortlist), queries, exact)
+                    name = f"{kind} top-{shortlist}" if shortlist > TOP_K else f"{kind} no rerank"
+                    report(size, name, codes.nbytes / 2**20, baseline, recall, p50)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [20_000, 200_000])
@@ -0,0 +1,43 @@
+"""Latency of retrieve_docs for first-seen versus repeated queries.
+
+Uses the configured embedding model and the ingested store, so run it after
+`python vector_database.py`. Run from the repository root:
+    python benchmarks/bench_query_cache.py 20
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_cache import cache_stats
+from rag_pipeline import get_embedding_model, get_retriever, retrieve_docs
+
+TEMPLATE = (
+    "You are a professional debt management advisor. Generate a concise and clear debt repayment "
+    "strategy based on the following financial context:\nMonthly income: {income} dollars\n"
+)
+
+
+def timed(query):
+    started = time.perf_counter()
+    retrieve_docs(query)
+    return time.perf_counter() - started
+
+
+def main(num_queries):
+    get_embedding_model(), get_retriever()  # Load outside the timings
+    queries = [TEMPLATE.format(income=4000 + 100 * n) for n in range(num_queries)]
+    cold = [timed(query) for query in queries]
+    warm = [timed(query) for query in queries]
+    # Whitespace and case differences normalize to the same key
+    respaced = [timed("  " + query.upper().replace(" ", "  ")) for query in queries]
+    print(f"{'first seen':>12}: {1000 * statistics.median(cold):8.3f} ms median")
+    print(f"{'repeated':>12}: {1000 * statistics.median(warm):8.3f} ms median")
+    print(f"{'respaced':>12}: {1000 * statistics.median(respaced):8.3f} ms median")
+    print(f"Cache stats: {cache_stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
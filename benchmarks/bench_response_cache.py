@@ -0,0 +1,71 @@
+"""Hit rate and latency saved by the LLM response cache, fully offline.
+
+A fake chat model that sleeps like a remote call stands in for Groq, and a
+fixed set of chunks stands in for retrieval. A workload of portfolios with
+repeats is answered twice: without the cache and with a fresh one. Run from
+the repository root:
+    python benchmarks/bench_response_cache.py 200 0.05
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A throwaway cache file, set before rag_pipeline reads the setting
+CACHE_DIR = tempfile.mkdtemp()
+os.environ["RESPONSE_CACHE_PATH"] = os.path.join(CACHE_DIR, "responses.sqlite")
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import rag_pipeline
+
+DOCUMENTS = [
+    "The debt avalanche pays the highest interest rate first.",
+    "The debt snowball pays the smallest balance first.",
+    "Consolidation can lower the rate on credit card debt.",
+]
+
+
+class SlowChatModel(FakeListChatModel):
+    """Canned answers after a fixed delay, like a remote model call."""
+
+    def _call(self, *args, **kwargs):
+        time.sleep(self.sleep or 0)
+        return super()._call(*args, **kwargs)
+
+
+def workload(requests, distinct=40, seed=0):
+    rng = random.Random(seed)
+    portfolios = [
+        f"Monthly Income: {3000 + 250 * (n % 8)}\nDebt 1: Credit Card, balance {1000 * (n + 1)}, APR 19%"
+        for n in range(distinct)
+    ]
+    return [rng.choice(portfolios) for _ in range(requests)]
+
+
+def run(queries, model, use_cache):
+    started = time.perf_counter()
+    for query in queries:
+        rag_pipeline.answer_query(DOCUMENTS, model, query, use_cache=use_cache)
+    return time.perf_counter() - started
+
+
+def main(requests, latency):
+    queries = workload(requests)
+    model = SlowChatModel(responses=["<think>...</think> Pay the card first."], sleep=latency)
+    uncached = run(queries, model, use_cache=False)
+    cached = run(queries, model, use_cache=True)
+    report = rag_pipeline.get_response_cache().report()
+    shutil.rmtree(CACHE_DIR)
+    print(f"{requests} requests, {len(set(queries))} distinct prompts, {latency * 1000:.0f} ms per LLM call")
+    print(f"{'no cache':>10}: {uncached:7.2f}s")
+    print(f"{'cache':>10}: {cached:7.2f}s ({uncached / cached:.1f}x)")
+    print(f"Hit rate {report['hit_rate']:.1%}, {report['seconds_saved']:.2f}s of LLM latency saved")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, float(sys.argv[2]) if len(sys.argv) > 2 else 0.05)
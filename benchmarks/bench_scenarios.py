@@ -0,0 +1,37 @@
+"""Times an advisor EMI sweep: one batched pass versus one simulation per scenario.
+
+Run from the repository root:
+    python benchmarks/bench_scenarios.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_payoff import make_portfolio
+from payoff_engine import calculate_debt_payoff, emi_sweep
+
+
+def main():
+    print(f"{'debts':>6} {'scenarios':>10} {'per-scenario s':>15} {'batched s':>10} {'speedup':>8}")
+    for num_debts in (1, 10, 100):
+        debts = make_portfolio(num_debts)
+        total_min = sum(d["min_emi"] for d in debts)
+        max_emi = total_min + 10_000
+
+        start = time.perf_counter()
+        results = emi_sweep(debts, max_emi, "Panic")
+        batched = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for r in results:
+            expected = calculate_debt_payoff(debts, r["strategy"], r["emi"], "Panic")
+            assert expected["months"] == r["months"]
+        separate = time.perf_counter() - start
+
+        print(f"{num_debts:>6} {len(results):>10} {separate:>15.2f} {batched:>10.2f} {separate / batched:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Cold-import time of the modules the Streamlit app loads at startup.
+
+Each sample imports the module in a fresh interpreter, so nothing is cached
+between runs. Nothing heavy should happen until first use; the target is
+well under a second. Run from the repository root:
+    python benchmarks/bench_startup.py rag_pipeline vector_database frontend
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGET_SECONDS = 1.0
+
+
+def cold_import(module):
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {ROOT!r}); import {module}"],
+        cwd=ROOT, capture_output=True, check=True
+    )
+    return time.perf_counter() - started
+
+
+def main(modules, runs=5):
+    print(f"{'module':>16} {'median s':>9} {'min s':>7}")
+    cold_import("os")  # Warm the OS page cache for the interpreter itself
+    for module in modules:
+        samples = [cold_import(module) for _ in range(runs)]
+        median = statistics.median(samples)
+        flag = "✅" if median < TARGET_SECONDS else "⚠️"
+        print(f"{module:>16} {median:>9.3f} {min(samples):>7.3f} {flag}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["rag_pipeline", "vector_database"])
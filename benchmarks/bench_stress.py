@@ -0,0 +1,95 @@
+"""Monte Carlo stress simulator: vectorized paths versus one dict loop per path.
+
+With every shock switched off each path must reproduce the deterministic
+engine exactly; with shocks on, the loop baseline runs the same model one
+path at a time. Run from the repository root:
+    python benchmarks/bench_stress.py 10000
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_payoff import make_portfolio
+from payoff_engine import MAX_SIMULATED_MONTHS, PAID_TOLERANCE, calculate_debt_payoff, strategy_order
+from stress_simulator import APR_CEILING, STRESS_SHOCKS, VARIABLE_APR_FLOOR, simulate_stress
+
+NO_SHOCKS = {"rate_drift": 0.0, "rate_volatility": 0.0, "income_loss": 0.0, "recovery": 1.0}
+LOOP_PATHS = 200
+
+
+def loop_path(debts, extra, shocks, rng):
+    """One path of the stress model with plain dicts, month by month."""
+    debts = [dict(d, balance=float(d['balance'])) for d in debts]
+    shift, out_of_work, total_interest = 0.0, False, 0.0
+    for month in range(1, MAX_SIMULATED_MONTHS + 1):
+        shift += shocks["rate_drift"] + shocks["rate_volatility"] * rng.gauss(0, 1)
+        draw = rng.random()
+        out_of_work = draw >= shocks["recovery"] if out_of_work else draw < shocks["income_loss"]
+        for d in debts:
+            apr = d['apr']
+            if apr >= VARIABLE_APR_FLOOR:
+                apr = min(max(apr + shift, 0.0), max(d['apr'], APR_CEILING))
+            interest = d['balance'] * apr / 1200
+            payment = min(d['min_emi'], d['balance'] + interest)
+            if payment < interest:
+                payment = min(interest + 0.01, d['balance'] + interest)
+            if out_of_work:
+                payment = 0.0
+            d['balance'] += interest - payment
+            total_interest += interest
+        remaining = 0.0 if out_of_work else extra
+        for d in debts:
+            if remaining <= 0:
+                break
+            if d['balance'] > PAID_TOLERANCE:
+                pay = min(remaining, d['balance'])
+                d['balance'] -= pay
+                remaining -= pay
+        if all(d['balance'] <= PAID_TOLERANCE for d in debts):
+            return month, total_interest
+    return float("inf"), total_interest
+
+
+def main(paths):
+    strategy, stress = "Avalanche Assault", "Panic"
+    print(f"{'debts':>6} {'paths':>7} {'loop s (est.)':>14} {'vectorized s':>13} {'speedup':>8}   months p50/p90/p99")
+    for num_debts in (3, 6, 20):
+        debts = make_portfolio(num_debts, seed=1)
+        emi = sum(d['min_emi'] for d in debts) * 1.3
+
+        # No shocks: every path is the deterministic plan
+        plan = calculate_debt_payoff(debts, strategy, emi, stress)
+        calm = simulate_stress(debts, strategy, emi, stress, paths=100, shocks=NO_SHOCKS)
+        assert calm['months']['p99'] == plan['months'], "paths diverged from the payoff engine"
+        assert abs(calm['total_interest']['p50'] - plan['total_interest']) <= 1e-6 * plan['total_interest']
+
+        ranked = [debts[i] for i in strategy_order(debts, strategy, stress)]
+        extra = emi - sum(d['min_emi'] for d in debts)
+        rng = random.Random(0)
+        started = time.perf_counter()
+        for _ in range(LOOP_PATHS):
+            loop_path(ranked, extra, STRESS_SHOCKS[stress], rng)
+        loop_seconds = (time.perf_counter() - started) / LOOP_PATHS * paths
+
+        result = min((simulate_stress(debts, strategy, emi, stress, paths=paths, workers=1, seed=0)
+                      for _ in range(3)), key=lambda r: r['seconds'])
+        months = "/".join(f"{v:.0f}" for v in result['months'].values())
+        print(f"{num_debts:>6} {paths:>7} {loop_seconds:>14.2f} {result['seconds']:>13.2f} "
+              f"{loop_seconds / result['seconds']:>7.0f}x   {months} (plan {plan['months']})")
+
+    # Fanning out only pays with spare cores
+    cores = os.cpu_count() or 1
+    if cores > 1:
+        debts = make_portfolio(6, seed=1)
+        emi = sum(d['min_emi'] for d in debts) * 1.3
+        simulate_stress(debts, strategy, emi, stress, paths=paths * 5, workers=cores)  # Start the pool
+        for workers in (1, cores):
+            seconds = simulate_stress(debts, strategy, emi, stress, paths=paths * 5, workers=workers)['seconds']
+            print(f"{paths * 5} paths, {workers} worker(s): {seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,66 @@
+"""Time to first visible token: blocking answer_query versus stream_answer_query.
+
+A local stand-in model streams a DeepSeek-R1 style response (<think> block, then
+the answer) word by word with a fixed per-token delay, so this runs offline.
+Run from the repository root:
+    python benchmarks/bench_ttft.py 0.01
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from rag_pipeline import answer_query, stream_answer_query
+
+DOCUMENTS = ["The debt avalanche pays the highest interest rate first."]
+QUERY = "Monthly Income: 4000\\nDebt 1: Credit Card, balance 10000, APR 18%"
+RESPONSE = (
+    "<think>" + " ".join(["The card has the highest APR so extra money goes there first."] * 30) + "</think>"
+    "\n\n" + " ".join(["1. Put every spare dollar on the credit card."] * 10)
+)
+
+
+class SlowStreamingModel(BaseChatModel):
+    """Streams RESPONSE a word at a time; invoke returns once every word is in, like a remote model."""
+
+    delay: float = 0.01
+
+    @property
+    def _llm_type(self):
+        return "slow-streaming-fake"
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in re.findall(r"\S+\s*", RESPONSE):
+            time.sleep(self.delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+
+def main(delay):
+    started = time.perf_counter()
+    answer_query(DOCUMENTS, SlowStreamingModel(delay=delay), QUERY, use_cache=False)
+    blocking = time.perf_counter() - started
+
+    first = {}
+    started = time.perf_counter()
+    for kind, _ in stream_answer_query(DOCUMENTS, SlowStreamingModel(delay=delay), QUERY, use_cache=False):
+        first.setdefault(kind, time.perf_counter() - started)
+    streamed = time.perf_counter() - started
+
+    print(f"{len(RESPONSE.split())} words, {delay * 1000:.0f} ms per word")
+    print(f"{'blocking':>22}: first visible token at {blocking * 1000:8.1f} ms")
+    print(f"{'streaming, reasoning':>22}: first visible token at {first['think'] * 1000:8.1f} ms")
+    print(f"{'streaming, answer':>22}: first visible token at {first['answer'] * 1000:8.1f} ms")
+    print(f"{'streaming, total':>22}: {streamed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.01)
@@ -0,0 +1,118 @@
+"""Recall@k against exact search, QPS and memory for each vector store backend.
+
+Synthetic corpora reuse bench_index's clustered vectors; `--pdfs` adds the
+bundled PDFs embedded with the real model. `mongo` needs an Atlas cluster
+with a vector search index and MONGO_URI set, and is off unless listed.
+Run from the repository root:
+    python benchmarks/bench_vector_store.py 10000 100000 --pdfs --backends numpy faiss faiss-flat mmap
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_index import synthetic_corpus, synthetic_queries, write_store
+from embedding_store import EmbeddingStore
+from vector_store import FaissVectorStore, MmapVectorStore, MongoVectorStore, NumpyVectorStore
+
+TOP_K = 3
+DEFAULT_BACKENDS = ["numpy", "faiss", "faiss-flat", "mmap"]
+MONGO_BENCH_COLLECTION = "embeddings_bench"
+
+
+def pdf_corpus():
+    from vector_database import get_embedding_model
+    from pdf_loader import iter_chunked_files, list_pdfs
+
+    texts = [c.page_content for _, chunks in iter_chunked_files(list_pdfs("pdfs/")) for c in chunks]
+    return np.asarray(get_embedding_model().embed_documents(texts), dtype=np.float32)
+
+
+def build(backend, store):
+    if backend == "numpy":
+        return NumpyVectorStore.from_store(store)
+    if backend == "faiss":
+        return FaissVectorStore.from_store(store, "HNSW32")
+    if backend == "faiss-flat":
+        return FaissVectorStore.from_store(store, "Flat")
+    if backend == "mmap":
+        return MmapVectorStore(store)
+    if backend == "mongo":
+        from vector_database import DATABASE_NAME, get_client
+
+        # A scratch collection; its Atlas index must be named VECTOR_SEARCH_INDEX
+        collection = get_client()[DATABASE_NAME][MONGO_BENCH_COLLECTION]
+        collection.delete_many({})
+        vector_store = MongoVectorStore(collection)
+        for start in range(0, store.count, 1000):
+            rows = range(start, min(start + 1000, store.count))
+            vector_store.add([store.chunk_id(r) for r in rows], store.matrix[start:rows.stop],
+                             [store.text(r) for r in rows])
+        return vector_store
+    raise ValueError(backend)
+
+
+def memory_bytes(vector_store):
+    if isinstance(vector_store, NumpyVectorStore):
+        return vector_store.buffer.nbytes
+    if isinstance(vector_store, FaissVectorStore):
+        import faiss
+
+        return faiss.serialize_index(vector_store.index).nbytes
+    if isinstance(vector_store, MmapVectorStore):
+        # Page cache, shared by every process that maps the store
+        directory = vector_store.directory
+        return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    return 0  # Held by the database server
+
+
+def recall(found, exact):
+    return np.mean([len({h[0] for h in f} & {h[0] for h in e}) / max(len(e), 1) for f, e in zip(found, exact)])
+
+
+def run(name, vectors, backends):
+    queries = synthetic_queries(vectors)
+    with tempfile.TemporaryDirectory() as directory:
+        write_store(directory, vectors)
+        store = EmbeddingStore(directory)
+        exact = NumpyVectorStore.from_store(store).batch_search(queries, TOP_K)
+        for backend in backends:
+            started = time.perf_counter()
+            vector_store = build(backend, store)
+            vector_store.search(queries[0], TOP_K)  # Loads any lazily built index
+            build_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            found = [vector_store.search(query, TOP_K) for query in queries]
+            qps = len(queries) / (time.perf_counter() - started)
+
+            started = time.perf_counter()
+            vector_store.batch_search(queries, TOP_K)
+            batch_qps = len(queries) / (time.perf_counter() - started)
+
+            print(f"{name:>10} {backend:>11} {build_seconds:>8.2f} {qps:>9.0f} {batch_qps:>10.0f} "
+                  f"{recall(found, exact):>9.3f} {memory_bytes(vector_store) / 2**20:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("sizes", nargs="*", type=int, default=[10_000, 100_000])
+    parser.add_argument("--pdfs", action="store_true", help="also benchmark the bundled PDF corpus")
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS)
+    args = parser.parse_args()
+
+    print(f"{'corpus':>10} {'backend':>11} {'build s':>8} {'QPS':>9} {'batch QPS':>10} "
+          f"{'recall@' + str(TOP_K):>9} {'MB':>8}")
+    if args.pdfs:
+        run("pdfs", pdf_corpus(), args.backends)
+    for size in args.sizes:
+        run(f"{size}", synthetic_corpus(size), args.backends)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import functools
+import os
+import re
+
+# ======================
+# 🧮 Context Budget
+# ======================
+# Retrieved chunks overlap by design (chunk_overlap=200 in `create_chunks`),
+# and the same passage often exists in more than one PDF. Before the LLM call
+# the chunks are assembled into one context:
+#
+#   1. neighbours from the same page whose [start_index, start_index + len)
+#      spans overlap or touch are merged into one passage, the overlap once
+#   2. passages whose word shingles mostly appear in a more relevant passage
+#      are dropped
+#   3. passages are packed most relevant first until CONTEXT_TOKEN_BUDGET is
+#      spent; the passage that crosses the budget is cut at a sentence end
+#
+# Tokens are counted with a local Hugging Face tokenizer (CONTEXT_TOKENIZER,
+# by default the embedding model's, already in the local model cache), or
+# estimated from words and punctuation when it can't be loaded.
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1024))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "sentence-transformers/all-MiniLM-L6-v2")
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Share of shingles already sent above which a passage adds nothing
+SHINGLE_WORDS = 3
+MIN_TRIMMED_TOKENS = 32  # A shorter tail of a passage is not worth sending
+
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(name=CONTEXT_TOKENIZER):
+    """The local tokenizer, or None when it isn't installed or cached."""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(name)
+    except (ImportError, OSError, ValueError):
+        print(f"⚠️ Tokenizer {name} unavailable, estimating token counts.")
+        return None
+
+
+def count_tokens(text):
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return len(WORD_PATTERN.findall(text))
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+class Passage:
+    """One or more merged chunks; `rank` is the best retrieval rank among them."""
+
+    def __init__(self, rank, text, metadata):
+        self.rank = rank
+        self.text = text
+        self.source = metadata.get("source")
+        self.page = metadata.get("page")
+        self.start = metadata.get("start_index")
+        self.chunks = 1
+
+    @property
+    def end(self):
+        return self.start + len(self.text)
+
+    def merge(self, other):
+        """Absorbs `other` if it overlaps or touches this passage on the same page."""
+        if self.start is None or other.start is None or (self.source, self.page) != (other.source, other.page):
+            return False
+        first, second = sorted((self, other), key=lambda p: p.start)
+        if second.start > first.end:
+            return False
+        text = first.text + second.text[first.end - second.start:] if second.end > first.end else first.text
+        self.text, self.start = text, first.start
+        self.rank = min(self.rank, other.rank)
+        self.chunks += other.chunks
+        return True
+
+
+def _split(document):
+    # Plain strings work too: they just never merge
+    return getattr(document, "page_content", document), getattr(document, "metadata", None) or {}
+
+
+def merge_neighbours(documents):
+    """Passages with overlapping neighbour chunks merged, most relevant first."""
+    passages = []
+    for rank, document in enumerate(documents):
+        passage = Passage(rank, *_split(document))
+        # A merge can bridge two passages, so keep folding until nothing changes
+        while True:
+            other = next((p for p in passages if passage.merge(p)), None)
+            if other is None:
+                break
+            passages.remove(other)
+        passages.append(passage)
+    return sorted(passages, key=lambda p: p.rank)
+
+
+def shingles(text):
+    words = WORD_PATTERN.findall(text.lower())
+    return {tuple(words[n:n + SHINGLE_WORDS]) for n in range(max(len(words) - SHINGLE_WORDS + 1, 1))}
+
+
+def drop_near_duplicates(passages, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Passages in order, minus any that mostly repeat an earlier (more relevant) one."""
+    kept = []
+    for passage in passages:
+        words = shingles(passage.text)
+        # Containment rather than Jaccard: a chunk inside a longer merged passage is a duplicate too
+        if all(len(words & seen) / len(words) < threshold for _, seen in kept):
+            kept.append((passage, words))
+    return [passage for passage, _ in kept]
+
+
+def trim_to_tokens(text, max_tokens):
+    """The longest prefix of `text` ending at a sentence boundary that fits `max_tokens`."""
+    tokens = count_tokens(text)
+    while tokens > max_tokens and text:
+        cut = int(len(text) * max_tokens / tokens)  # Proportional guess, then back off to a sentence end
+        ends = [m.end() for m in SENTENCE_END.finditer(text, 0, cut)]
+        text = text[:ends[-1]] if ends else text[:cut].rsplit(" ", 1)[0]
+        tokens = count_tokens(text)
+    return text, tokens
+
+
+def assemble_context(documents, budget=CONTEXT_TOKEN_BUDGET):
+    """Retrieved chunks (best first) as one deduplicated context of at most `budget` tokens."""
+    passages = drop_near_duplicates(merge_neighbours(documents))
+    parts, used = [], 0
+    for passage in passages:
+        tokens = count_tokens(passage.text)
+        if used + tokens > budget:
+            if budget - used < MIN_TRIMMED_TOKENS:
+                break
+            text, tokens = trim_to_tokens(passage.text, budget - used)
+            if text:
+                parts.append(text)
+                used += tokens
+            break
+        parts.append(passage.text)
+        used += tokens
+    raw = sum(count_tokens(_split(document)[0]) for document in documents)
+    print(f"🧮 Context: {len(documents)} chunks -> {len(parts)} passages, "
+          f"{raw} -> {used} tokens (budget {budget})")
+    return "\n\n".join(parts)
@@ -0,0 +1,333 @@
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds still swap files in whole, just without the cross-process lock
+    fcntl = None
+
+# ======================
+# 🧊 Memory-mapped Embedding Store
+# ======================
+# Chunk embeddings are written once as a contiguous row-major matrix next to
+# a compact id/offset sidecar and a UTF-8 text blob. Readers `np.memmap` the
+# files, so loading parses nothing, queries allocate nothing per document and
+# every worker process on the box shares the same page-cached pages.
+#
+#   store.json        {"dim", "dtype", "count", "generation", "normalized"};
+#                     rewritten last, so readers only ever map rows that are
+#                     fully on disk. `generation` changes whenever the store
+#                     is rebuilt
+#   embeddings.bin    count x dim matrix (float32 or float16)
+#   chunk_ids.bin     count x 24-byte Mongo ObjectId hex strings
+#   text_offsets.bin  count + 1 uint64 byte offsets into texts.bin
+#   texts.bin         concatenated UTF-8 chunk texts
+#
+# Rows are L2-normalized on the way in, so inner product is cosine similarity.
+#
+# A rebuild is written to a scratch directory and renamed over the live
+# files, store.json last, under an flock on the store's lock file: app
+# processes cold-starting together rebuild once, and readers see either the
+# old store or the new one, never a half-written one.
+
+STORE_DIR = "vectorstore"
+META_FILE = "store.json"
+MATRIX_FILE = "embeddings.bin"
+IDS_FILE = "chunk_ids.bin"
+OFFSETS_FILE = "text_offsets.bin"
+TEXTS_FILE = "texts.bin"
+LOCK_FILE = ".lock"
+MAP_RETRIES = 100  # Refreshes that raced a rebuild's file swap retry this often, a millisecond apart
+
+ID_DTYPE = np.dtype("S24")
+OFFSET_DTYPE = np.dtype("<u8")
+SUPPORTED_DTYPES = ("float32", "float16")
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+SEARCH_BLOCK_ROWS = 65_536  # Rows upcast at a time when scoring a float16 matrix
+SYNC_BATCH_SIZE = 5_000
+
+
+def normalize(vectors):
+    """Unit-length float32 rows (or a unit-length vector); zero vectors stay zero."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def top_k_rows(scores, top_k):
+    """Indices of the `top_k` largest scores, best first."""
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    rows = np.argpartition(scores, -top_k)[-top_k:]
+    return rows[np.argsort(scores[rows])[::-1]]
+
+
+def _map(path, dtype, shape):
+    if not shape[0] or not os.path.getsize(path):
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+class EmbeddingStore:
+    """Read side of the store: memory-maps whatever the last writer committed."""
+
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+        self.meta_mtime = -1  # Never mapped yet
+        self.lock = threading.Lock()
+        self.refresh()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def refresh(self):
+        """Re-maps the files if a writer has committed new rows since the last look."""
+        for _ in range(MAP_RETRIES):
+            try:
+                return self._refresh()
+            except ValueError:
+                # A rebuild swapped in shorter files after store.json was read:
+                # its own store.json is about to follow
+                time.sleep(0.001)
+        return self._refresh()
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path(META_FILE))
+            mtime = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self.meta_mtime:
+            return False
+        with self.lock:
+            if mtime is None:
+                self.dim, self.dtype, self.count, self.generation = 0, np.dtype(EMBEDDING_DTYPE), 0, 0
+                self.normalized = True
+                self.matrix = np.zeros((0, 0), dtype=self.dtype)
+                self.ids = np.zeros(0, dtype=ID_DTYPE)
+                self.offsets = np.zeros(1, dtype=OFFSET_DTYPE)
+                self.texts = np.zeros(0, dtype=np.uint8)
+                self.meta_mtime = mtime
+                return True
+            with open(self.path(META_FILE)) as f:
+                meta = json.load(f)
+            self.dim, self.dtype, self.count = meta["dim"], np.dtype(meta["dtype"]), meta["count"]
+            self.generation = meta.get("generation", 0)
+            self.normalized = meta.get("normalized", False)  # Stores written before normalization need a rebuild
+            self.matrix = _map(self.path(MATRIX_FILE), self.dtype, (self.count, self.dim))
+            self.ids = _map(self.path(IDS_FILE), ID_DTYPE, (self.count,))
+            self.offsets = _map(self.path(OFFSETS_FILE), OFFSET_DTYPE, (self.count + 1,))
+            self.texts = _map(self.path(TEXTS_FILE), np.uint8, (int(self.offsets[-1]),))
+            self.meta_mtime = mtime
+        return True
+
+    def chunk_id(self, row):
+        return self.ids[row].decode()
+
+    def text(self, row):
+        return bytes(self.texts[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def scores(self, query):
+        """Inner product of `query` with every stored row."""
+        query = normalize(query)
+        if self.dtype == np.float32:
+            return self.matrix @ query
+        scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+            block = self.matrix[start:start + SEARCH_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+    def search(self, query, top_k=3):
+        """Exact top-k as (row, score) pairs, best first."""
+        if self.count == 0:
+            return []
+        scores = self.scores(query)
+        return [(int(row), float(scores[row])) for row in top_k_rows(scores, top_k)]
+
+
+class EmbeddingStoreWriter:
+    """Append-only writer; one ingestion process writes while any number read."""
+
+    def __init__(self, directory=STORE_DIR, dtype=EMBEDDING_DTYPE):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype {dtype!r}, expected one of {SUPPORTED_DTYPES}")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        with store_lock(directory):
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    self.meta = json.load(f)
+                self._truncate_uncommitted()
+            else:
+                self.meta = {"dim": 0, "dtype": dtype, "count": 0, "generation": 0, "normalized": True}
+                self.reset(dtype)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def reset(self, dtype=None):
+        """Empties the store, e.g. before a full rebuild from Mongo."""
+        self.meta = {
+            "dim": 0,
+            "dtype": dtype or self.meta["dtype"],
+            "count": 0,
+            "generation": self.meta.get("generation", 0) + 1,
+            "normalized": True,
+        }
+        # Swap in fresh files rather than truncating, so readers that still
+        # map the old ones keep valid pages until they refresh
+        for name in (MATRIX_FILE, IDS_FILE, TEXTS_FILE, OFFSETS_FILE):
+            tmp = self.path(name + ".tmp")
+            with open(tmp, "wb") as f:
+                if name == OFFSETS_FILE:
+                    f.write(np.zeros(1, dtype=OFFSET_DTYPE).tobytes())
+            os.replace(tmp, self.path(name))
+        self._commit()
+
+    def _truncate_uncommitted(self):
+        """Drops bytes a crashed writer appended after the last committed count."""
+        count, dim = self.meta["count"], self.meta["dim"]
+        offsets = np.fromfile(self.path(OFFSETS_FILE), dtype=OFFSET_DTYPE, count=count + 1)
+        sizes = {
+            MATRIX_FILE: count * dim * np.dtype(self.meta["dtype"]).itemsize,
+            IDS_FILE: count * ID_DTYPE.itemsize,
+            OFFSETS_FILE: (count + 1) * OFFSET_DTYPE.itemsize,
+            TEXTS_FILE: int(offsets[-1]),
+        }
+        for name, size in sizes.items():
+            with open(self.path(name), "r+b") as f:
+                f.truncate(size)
+
+    def _commit(self):
+        tmp = self.path(META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.path(META_FILE))
+
+    def append(self, ids, embeddings, texts):
+        """Appends rows and commits them in one step."""
+        if not len(ids):
+            return
+        with store_lock(self.directory):
+            # Start from what is committed: another process may have rebuilt the store since
+            with open(self.path(META_FILE)) as f:
+                self.meta = json.load(f)
+            matrix = normalize(embeddings).astype(self.meta["dtype"])
+            if matrix.ndim != 2 or len(matrix) != len(ids) or len(texts) != len(ids):
+                raise ValueError("ids, embeddings and texts must describe the same rows")
+            if self.meta["dim"] and matrix.shape[1] != self.meta["dim"]:
+                raise ValueError(f"Expected {self.meta['dim']}-dim embeddings, got {matrix.shape[1]}")
+            self._append(ids, matrix, texts)
+
+    def _append(self, ids, matrix, texts):
+        encoded = [t.encode("utf-8") for t in texts]
+        start = int(np.fromfile(self.path(OFFSETS_FILE), dtype=OFFSET_DTYPE, count=1,
+                                offset=self.meta["count"] * OFFSET_DTYPE.itemsize)[0])
+        offsets = start + np.cumsum([len(t) for t in encoded], dtype=OFFSET_DTYPE)
+
+        with open(self.path(MATRIX_FILE), "ab") as f:
+            f.write(np.ascontiguousarray(matrix).tobytes())
+        with open(self.path(IDS_FILE), "ab") as f:
+            f.write(np.array([str(i) for i in ids], dtype=ID_DTYPE).tobytes())
+        with open(self.path(TEXTS_FILE), "ab") as f:
+            f.write(b"".join(encoded))
+        with open(self.path(OFFSETS_FILE), "ab") as f:
+            f.write(offsets.tobytes())
+
+        self.meta["dim"] = matrix.shape[1]
+        self.meta["count"] += len(ids)
+        self._commit()
+
+
+@contextlib.contextmanager
+def store_lock(directory=STORE_DIR):
+    """Exclusive, cross-process lock on the store in `directory` (a no-op without fcntl)."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def replace_store(directory, batches, dtype=EMBEDDING_DTYPE):
+    """Writes (ids, embeddings, texts) `batches` as a new store generation and swaps it in.
+
+    Hold `store_lock` around it. The new files are renamed over the old ones,
+    store.json last, so readers mapping the old files keep valid pages.
+    """
+    os.makedirs(directory, exist_ok=True)
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            generation = json.load(f).get("generation", 0)
+    except FileNotFoundError:
+        generation = 0
+    scratch = tempfile.mkdtemp(prefix=".rebuild-", dir=directory)  # Same filesystem: swaps are renames
+    try:
+        writer = EmbeddingStoreWriter(scratch, dtype)
+        writer.meta["generation"] = generation + 1
+        writer._commit()
+        for ids, embeddings, texts in batches:
+            writer.append(ids, embeddings, texts)
+        for name in (MATRIX_FILE, IDS_FILE, TEXTS_FILE, OFFSETS_FILE, META_FILE):
+            os.replace(os.path.join(scratch, name), os.path.join(directory, name))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _collection_batches(collection, batch_size):
+    ids, vectors, texts = [], [], []
+    for doc in collection.find({}, {"text": 1, "embedding": 1}).batch_size(batch_size):
+        ids.append(doc["_id"])
+        vectors.append(doc["embedding"])
+        texts.append(doc["text"])
+        if len(ids) == batch_size:
+            yield ids, vectors, texts
+            ids, vectors, texts = [], [], []
+    yield ids, vectors, texts
+
+
+def rebuild_from_collection(collection, directory=STORE_DIR, dtype=EMBEDDING_DTYPE, batch_size=SYNC_BATCH_SIZE):
+    """Rewrites the store from the documents in Mongo, the source of truth."""
+    with store_lock(directory):
+        replace_store(directory, _collection_batches(collection, batch_size), dtype)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(collection, directory=STORE_DIR):
+    """Maps the store once per process, rebuilding it first if it disagrees with Mongo."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            store = EmbeddingStore(directory)
+
+            def stale():
+                return store.count != collection.estimated_document_count() or not store.normalized
+
+            if stale():
+                with store_lock(directory):
+                    store.refresh()  # Another process may have rebuilt it while this one waited
+                    if stale():
+                        print("🔄 Rebuilding embedding store from MongoDB...")
+                        replace_store(directory, _collection_batches(collection, SYNC_BATCH_SIZE))
+                        store.refresh()
+            _store = store
+        else:
+            _store.refresh()
+        return _store
@@ -1,12 +1,24 @@
 import streamlit as st
+import asyncio
 import json
 import time
 from datetime import datetime, timedelta
-from rag_pipeline import answer_query, retrieve_docs, llm_model
+from rag_pipeline import stream_answer_query, retrieve_docs, get_llm_model, get_retriever
+from payoff_engine import emi_sweep, select_strategy
+from payoff_optimizer import optimize_order
+from stress_simulator import INTERACTIVE_PATHS, simulate_stress
+from plan_cache import PlanCache, plan_key
+from async_pipeline import aprepare_battle_plan
+from query_cache import cache_stats
+from tracing import TRACE_PROFILE, export_json, write_profiles
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Heavy resources are built on first use and shared by every session in this process
+llm_model = st.cache_resource(get_llm_model)()
+st.cache_resource(get_retriever)()
+
 # ======================
 # 🎮 Game Theme Setup
 # ======================
@@ -42,105 +54,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# ======================
-# 🧠 Enhanced Algorithm Core (Updated)
-# ======================
-def select_strategy(debts, motivation, stress_level):
-    """Selects a debt repayment strategy based on user motivation and stress level."""
-    if motivation == "Quick Strikes":
-        return "Avalanche Assault"  # Pay off high-interest debts first
-    elif motivation == "Long Campaign":
-        return "Snowball Charge"  # Pay off smaller debts first
-    else:
-        # Stress level can influence the strategy
-        if stress_level == "Calm":
-            return "Avalanche Assault"
-        elif stress_level == "Tense":
-            return "Snowball Charge"
-        else:  # Panic
-            # Mix of strategy for quick wins and long-term control
-            return "Hybrid Strategy"
-
-
-def calculate_debt_payoff(debts, strategy, available_emi, stress_level):
-    """Enhanced payoff calculator with precise tracking"""
-    debts = [d.copy() for d in debts]
-    for d in debts:
-        d['balance'] = float(d['balance'])
-        d['total_interest'] = 0.0
-
-    total_min = sum(d['min_emi'] for d in debts)
-    extra_budget = max(available_emi - total_min, 0)  # Ensure non-negative
-    
-    # Strategy sorting
-    if strategy == "Avalanche Assault":
-        ordered_debts = sorted(debts, key=lambda x: (-x['apr'], x['balance']))
-    elif strategy == "Snowball Charge":
-        ordered_debts = sorted(debts, key=lambda x: (x['balance'], -x['apr']))
-    else:
-        stress_factor = {"Calm": 0.2, "Tense": 0.5, "Panic": 0.8}[stress_level]
-        threshold = sum(d['balance'] for d in debts) * stress_factor / len(debts)
-        ordered_debts = sorted(debts, key=lambda x: (
-            -x['apr'] if x['balance'] > threshold else x['balance'],
-            x['balance']
-        ))
-
-    payoff_plan = []
-    months = 0
-    debt_tracker = {d['name']: {'paid_month': None, 'total_interest': 0.0} for d in debts}
-    current_date = datetime.now()
-
-    while any(d['balance'] > 0.01 for d in debts):  # Floating point tolerance
-        months += 1
-        monthly_interest = 0
-        paid_this_month = []
-
-        # Process minimum payments
-        for d in debts:
-            if d['balance'] <= 0:
-                continue
-                
-            interest = d['balance'] * d['apr']/1200
-            payment = min(d['min_emi'], d['balance'] + interest)
-            
-            # Ensure payment covers at least interest
-            if payment < interest:
-                payment = min(interest + 0.01, d['balance'] + interest)
-                
-            principal = payment - interest
-            d['balance'] -= principal
-            d['total_interest'] += interest
-            debt_tracker[d['name']]['total_interest'] += interest
-            monthly_interest += interest
-
-        # Process extra payments
-        remaining_extra = extra_budget
-        for d in ordered_debts:
-            if d['balance'] <= 0.01 or remaining_extra <= 0:
-                continue
-                
-            possible_payment = min(remaining_extra, d['balance'])
-            d['balance'] -= possible_payment
-            remaining_extra -= possible_payment
-            
-            if d['balance'] <= 0.01 and not debt_tracker[d['name']]['paid_month']:
-                paid_this_month.append(d['name'])
-                debt_tracker[d['name']]['paid_month'] = months
-
-        # Track payoff progress
-        if paid_this_month:
-            payoff_plan.append({
-                'month': months,
-                'paid_debts': paid_this_month,
-                'remaining_debt': sum(d['balance'] for d in debts)
-            })
-
-    return {
-        'total_interest': sum(d['total_interest'] for d in debts),
-        'months': months,
-        'payoff_plan': payoff_plan,
-        'debt_tracker': debt_tracker
-    }
 # ======================
 # 🛡️ User Input Section
 # ======================
@@ -177,8 +90,8 @@ with st.form("warrior_form"):
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.form_submit_button("⚔️ Prepare for Battle - Submit Data"):
-            with open("user_data.json", "w") as f:
-                json.dump({"user": user_data, "debts": debts}, f)
+            # Kept per session, so concurrent users never overwrite each other's data
+            st.session_state["battle_data"] = {"user": dict(user_data), "debts": [dict(d) for d in debts]}
 
 # ======================
 # 🧙 AI Battle Planner
@@ -189,7 +102,9 @@ with col1:
 with col2:
     show_think = st.checkbox("Reveal Magic")
 think_text = ""
-if ask_question:
+if ask_question and "battle_data" not in st.session_state:
+    st.warning("Please submit your data first!")
+elif ask_question:
     # strategy = select_strategy(debts, user_data["motivation"])
     # battle_plan = {
     #     "strategy": strategy,
@@ -221,30 +136,85 @@ if ask_question:
     #     with st.expander(f"Step {i+1}: Attack {step['target']}"):
     #         st.write(f"⚔️ Pay ${step['payment']:.2f}/month → Vanquish in {int(step['months'])} months")
 
-    with open("user_data.json", "r") as f:
-            data = json.load(f)
-            user_data = data['user']
-            debts = data['debts']
+    user_data = st.session_state["battle_data"]["user"]
+    debts = st.session_state["battle_data"]["debts"]
 
     strategy = select_strategy(debts, user_data["motivation"], user_data["stress"])
     current_year = datetime.now().year
     
-    # Calculate scenarios
-    min_battle = calculate_debt_payoff(debts, strategy, sum(d['min_emi'] for d in debts), user_data["stress"])
-    current_battle = calculate_debt_payoff(debts, strategy, user_data["emi"], user_data["stress"])
+    financial_context = f"""
+    Monthly Income: ${user_data["income"]}
+    Monthly Expenses: ${user_data["expenses"]}
+    Available for Battles: ${user_data["emi"]}
+    Motivation: {user_data["motivation"]}
+    Stress Level: {user_data["stress"]}
+    """
+
+    # Add details for each debt
+    if debts:
+        financial_context += "\nDebts:\n"
+        for i, debt in enumerate(debts):
+            financial_context += (
+                f"Debt {i + 1}:\n"
+                f"  Name: {debt['name']}\n"
+                f"  Balance: ${debt['balance']}\n"
+                f"  APR: {debt['apr']}%\n"
+                f"  Min EMI: ${debt['min_emi']}\n"
+            )
+
+    # Combine user query with financial context
+    full_query = f"You are a professional debt management advisor. Generate a concise and clear three point debt repayment strategy based on the following financial context:\n{financial_context}"
+
+    # Reruns and repeat clicks reuse this session's plan for the same inputs
+    plan_cache = st.session_state.setdefault("plan_cache", PlanCache())
+    key = plan_key(debts, user_data["emi"], strategy, user_data["stress"])
+    plan = plan_cache.get(key)
+    if plan is None:
+        # Calculate scenarios while the strategy documents are retrieved
+        min_battle, current_battle, retrieved_docs = asyncio.run(
+            aprepare_battle_plan(debts, strategy, user_data["emi"], user_data["stress"], full_query)
+        )
+        plan = {
+            "min_battle": min_battle,
+            "current_battle": current_battle,
+            "stress_test": simulate_stress(debts, strategy, user_data["emi"], user_data["stress"],
+                                           paths=INTERACTIVE_PATHS),
+            "emi_sweep": emi_sweep(debts, user_data["emi"], user_data["stress"]),
+            "best_order": optimize_order(debts, user_data["emi"], user_data["stress"])
+        }
+        plan_cache.set(key, plan)
+    else:
+        retrieved_docs = retrieve_docs(full_query)
+    min_battle, current_battle = plan["min_battle"], plan["current_battle"]
 
     # 1️⃣ Overall Summary (Big Picture View)
     st.markdown("## 1️⃣ Overall Summary (Big Picture View)")
 
     total_debt_remaining = sum(d['balance'] for d in debts)
     total_interest_paid = current_battle['total_interest']
-    projected_debt_free_date = current_year + current_battle['months'] // 12
+    projected_debt_free_date = current_year + current_battle['months'] // 12 if current_battle['converged'] else "Never"
+
+    # Minimums below the monthly interest never pay a debt down on their own
+    if current_battle['diverging_debts']:
+        st.warning(f"⚠️ Minimum EMI doesn't cover the interest on: {', '.join(current_battle['diverging_debts'])}")
 
     st.write(f"✅ Total Debt Remaining: ${total_debt_remaining:,.0f}")
-    st.write(f"✅ Current Interest Paid Yearly: ${total_interest_paid / current_battle['months'] * 12:,.0f}")
+    st.write(f"✅ Current Interest Paid Yearly: ${total_interest_paid / max(current_battle['months'], 1) * 12:,.0f}")
     st.write(f"✅ Projected Debt-Free Date: {projected_debt_free_date} (at min EMI)")
     st.write(f"✅ Strategy Chosen: {strategy}")
 
+    # The same plan replayed under random APR hikes and lost-income months
+    stress_test = plan["stress_test"]
+    st.markdown(f"### 🎲 Stress Test ({stress_test['paths']:,} simulated futures)")
+    st.table([
+        {"Outcome": "Debt-free in (months)", "Plan": f"{current_battle['months']}" if current_battle['converged'] else "Never",
+         **{p: "Never" if v == float("inf") else f"{v:.0f}" for p, v in stress_test['months'].items()}},
+        {"Outcome": "Total interest", "Plan": f"${current_battle['total_interest']:,.0f}",
+         **{p: f"${v:,.0f}" for p, v in stress_test['total_interest'].items()}}
+    ])
+    if stress_test['never_paid_off']:
+        st.warning(f"⚠️ {stress_test['never_paid_off']:.1%} of simulated futures never clear the debt")
+
     # 2️⃣ Suggested EMI & Interest Savings
     st.markdown("## 2️⃣ Suggested EMI & Interest Savings")
     table_data = []
@@ -266,6 +236,22 @@ if ask_question:
     
     st.table(table_data)
 
+    # EMI vs interest curve for every strategy, simulated in one batched pass
+    curve = {"EMI": []}
+    for scenario in plan["emi_sweep"]:
+        if scenario['strategy'] == "Avalanche Assault":
+            curve["EMI"].append(scenario['emi'])
+        curve.setdefault(scenario['strategy'], []).append(scenario['total_interest'])
+    st.line_chart(curve, x="EMI", y_label="Total Interest")
+
+    # Searched attack order, beyond the three fixed ones
+    st.markdown("## 🎯 Optimized Attack Order")
+    best = plan["best_order"]
+    st.write(f"✅ Attack Order: {' → '.join(best['order'])}")
+    st.write(f"✅ Total Interest: ${best['result']['total_interest']:,.0f} "
+             f"(${current_battle['total_interest'] - best['result']['total_interest']:,.0f} less than {strategy})")
+    st.write(f"✅ Debt-Free In: {best['result']['months']} months (vs {current_battle['months']})")
+
     # 3️⃣ Action Plan Breakdown (Step-by-Step)
     st.markdown("## 3️⃣ Action Plan Breakdown (Step-by-Step)")
     for i, step in enumerate(current_battle['payoff_plan']):
@@ -282,59 +268,30 @@ if ask_question:
             💰 Savings: {-1*saved:.0f} interest
             """)
 
-    financial_context = f"""
-    Monthly Income: ${user_data["income"]}
-    Monthly Expenses: ${user_data["expenses"]}
-    Available for Battles: ${user_data["emi"]}
-    Motivation: {user_data["motivation"]}
-    Stress Level: {user_data["stress"]}
-    """
-
-    # Add details for each debt
-    if debts:
-        financial_context += "\nDebts:\n"
-        for i, debt in enumerate(debts):
-            financial_context += (
-                f"Debt {i + 1}:\n"
-                f"  Name: {debt['name']}\n"
-                f"  Balance: ${debt['balance']}\n"
-                f"  APR: {debt['apr']}%\n"
-                f"  Min EMI: ${debt['min_emi']}\n"
-            )
-
-    # Combine user query with financial context
-    full_query = f"You are a professional debt management advisor. Generate a concise and clear three point debt repayment strategy based on the following financial context:\n{financial_context}"
-
-    # RAG Pipeline
-    
-    retrieved_docs = retrieve_docs(full_query)
-    response = answer_query(documents=retrieved_docs, model=llm_model, query=full_query)
-
-    import re
-    def extract_think_content(text):
-        """Extract content inside <think> tags and remove it from the main content."""
-        think_match = re.search(r"<think>(.*?)</think>", text, re.DOTALL)
-        think_content = think_match.group(1).strip() if think_match else "No additional information."
-        
-        # Remove <think> content from main response
-        main_content = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
-        
-        return main_content, think_content
-    
-    main_text, think_text = extract_think_content(response.content)
-
     # --- UI STARTS HERE ---
-    st.write(main_text)
+    # Tokens are rendered as they stream in; reasoning inside <think> goes to
+    # its own panel, so nothing waits for the full response
+    main_box = st.empty()
+    main_box.info("🧠 Debt Slayer is thinking...")
+    if show_think:
+        st.write("### Debt Slayer: Reasoning")
+        think_box = st.empty()
+
+    main_text, think_text = "", ""
+    for kind, text in stream_answer_query(documents=retrieved_docs, model=llm_model, query=full_query):
+        if kind == "answer":
+            main_text += text
+            if main_text.strip():
+                main_box.write(main_text)
+        elif show_think:
+            think_text += text
+            think_box.write(think_text)
 
     if show_think:
-        if think_text:
-            st.write("### Debt Slayer: Reasoning")
-            st.write(think_text)
-        else:
-            st.write("enter query to see the reasoning")
+        if not think_text.strip():
+            think_box.write("No additional information.")
         # Display LLM Response
         st.success("Strategy Generated!")
-        # st.write(response.content)
 
 # ======================
 # 💬 Chatbot for Additional Queries
@@ -372,10 +329,54 @@ if st.button("Ask"):
         # Pass the user query to the LLM
         with st.spinner("Thinking..."):
             retrieved_docs = retrieve_docs(full_query+user_query)
-            response = answer_query(documents=retrieved_docs, model=llm_model, query=full_query+user_query)
-        
-        # Display the response
+
+        # Display the response as it streams in
         st.chat_message("user").write(user_query)
-        st.chat_message("AI Financial Assistant").write(response.content)
+        with st.chat_message("AI Financial Assistant"):
+            reasoning = st.expander("Reasoning").empty()
+            answer_box = st.empty()
+            answer_text, reasoning_text = "", ""
+            for kind, text in stream_answer_query(documents=retrieved_docs, model=llm_model, query=full_query+user_query):
+                if kind == "answer":
+                    answer_text += text
+                    answer_box.write(answer_text)
+                else:
+                    reasoning_text += text
+                    reasoning.write(reasoning_text)
     else:
         st.warning("Please enter a query!")
+
+
+# ======================
+# 🛠️ Debug Panel
+# ======================
+# Per-stage latency from `tracing` (process-wide, every session) and this
+# session's cache counters. The JSON download is the same snapshot the
+# pipeline benchmark writes.
+with st.sidebar.expander("🛠️ Debug Panel"):
+    trace = export_json()
+    if trace["stages"]:
+        st.table([
+            {
+                "Stage": stage,
+                "Calls": stats["count"],
+                "p50 (ms)": f"{stats['p50_ms']:.1f}",
+                "p95 (ms)": f"{stats['p95_ms']:.1f}",
+                "p99 (ms)": f"{stats['p99_ms']:.1f}",
+                "Max (ms)": f"{stats['max_ms']:.1f}"
+            }
+            for stage, stats in trace["stages"].items()
+        ])
+    else:
+        st.write("No stages traced yet.")
+    st.write("Query caches:", cache_stats())
+    if "plan_cache" in st.session_state:
+        st.write("Plan cache:", st.session_state["plan_cache"].stats)
+    st.download_button(
+        "⬇️ Download trace (JSON)",
+        data=json.dumps(trace, indent=1),
+        file_name="trace.json",
+        mime="application/json"
+    )
+    if TRACE_PROFILE and st.button("💾 Write profiles"):
+        st.write(write_profiles())
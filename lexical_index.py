@@ -0,0 +1,190 @@
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from embedding_store import top_k_rows
+
+# ======================
+# 🔤 Lexical Index + Hybrid Retrieval
+# ======================
+# Financial questions lean on exact terms ("APR", "avalanche", "student
+# loan") that dense scoring blurs. A BM25 inverted index over the same rows
+# as the embedding store is built at ingestion time, grown incrementally as
+# chunks are appended and saved as flat postings arrays, one file per store
+# generation. Retrieval fuses the dense and BM25 rankings with reciprocal
+# rank fusion, within a fixed latency budget.
+#
+#   vocab        terms, in term-id order
+#   offsets      (terms + 1) int64; postings of term t are [offsets[t], offsets[t + 1])
+#   docs         uint32 store rows, ascending within a term
+#   tfs          uint16 term frequencies
+#   doc_lengths  uint32 tokens per row
+
+LEXICAL_FILE = "lexical-{generation}.npz"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+HYBRID_CANDIDATES = 50  # Depth of each ranking that goes into the fusion
+HYBRID_BUDGET_MS = float(os.getenv("HYBRID_BUDGET_MS", 50))
+SYNC_BATCH_SIZE = 5_000
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i in is it its me my of on or our so that the their this "
+    "to was we what when which who will with you your".split()
+)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]  # loans -> loan, debts -> debt
+        tokens.append(token)
+    return tokens
+
+
+class LexicalIndex:
+    """BM25 over store rows; postings are kept as flat, term-sorted arrays."""
+
+    def __init__(self, generation=0, directory=None):
+        self.generation = generation
+        self.directory = directory
+        self.vocab = {}  # term -> term id
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.docs = np.zeros(0, dtype=np.uint32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        self.doc_lengths = np.zeros(0, dtype=np.uint32)
+
+    @property
+    def size(self):
+        return len(self.doc_lengths)
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.docs.nbytes + self.tfs.nbytes + self.doc_lengths.nbytes
+
+    def add(self, texts):
+        """Indexes texts as the next rows."""
+        start = self.size
+        term_ids, docs, tfs, lengths = [], [], [], []
+        for n, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                docs.append(start + n)
+                tfs.append(min(tf, 65_535))
+
+        # Merge into the postings: a stable sort by term keeps rows ascending per term
+        old_terms = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        terms = np.concatenate([old_terms, np.asarray(term_ids, dtype=np.int64)])
+        order = np.argsort(terms, kind="stable")
+        self.docs = np.concatenate([self.docs, np.asarray(docs, dtype=np.uint32)])[order]
+        self.tfs = np.concatenate([self.tfs, np.asarray(tfs, dtype=np.uint16)])[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=len(self.vocab)))])
+        self.doc_lengths = np.concatenate([self.doc_lengths, np.asarray(lengths, dtype=np.uint32)])
+
+    def search(self, query, top_k=3, deadline=None):
+        """Top-k (row, score) pairs by BM25, best first.
+
+        Terms are scored rarest first; past `deadline` (a perf_counter time)
+        the remaining, most common and least informative, terms are skipped.
+        """
+        if self.size == 0:
+            return []
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        term_ids = sorted(term_ids, key=lambda t: self.offsets[t + 1] - self.offsets[t])
+        average_length = max(self.doc_lengths.mean(), 1.0)
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term_id in term_ids:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            postings = slice(self.offsets[term_id], self.offsets[term_id + 1])
+            docs, tfs = self.docs[postings], self.tfs[postings].astype(np.float32)
+            df = len(docs)
+            idf = np.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[docs] / average_length)
+            scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+        return [(int(row), float(scores[row])) for row in top_k_rows(scores, top_k) if scores[row] > 0]
+
+    def path(self):
+        return os.path.join(self.directory, LEXICAL_FILE.format(generation=self.generation))
+
+    def save(self):
+        path = self.path()
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, vocab=np.array(list(self.vocab), dtype=str), offsets=self.offsets, docs=self.docs,
+                 tfs=self.tfs, doc_lengths=self.doc_lengths)
+        os.replace(tmp, path)
+        # Indexes for earlier generations of the store are dead weight
+        for name in os.listdir(self.directory):
+            if name.startswith("lexical-") and name.endswith(".npz") and name != os.path.basename(path):
+                os.remove(os.path.join(self.directory, name))
+
+    @classmethod
+    def load(cls, generation, directory):
+        index = cls(generation, directory)
+        if not os.path.exists(index.path()):
+            return None
+        with np.load(index.path()) as data:
+            index.vocab = {term: n for n, term in enumerate(data["vocab"].tolist())}
+            index.offsets, index.docs = data["offsets"], data["docs"]
+            index.tfs, index.doc_lengths = data["tfs"], data["doc_lengths"]
+        return index
+
+
+def sync_lexical_index(index, store, batch_size=SYNC_BATCH_SIZE):
+    """Indexes store rows the lexical index has not seen yet; returns True if anything changed."""
+    if index.size == store.count:
+        return False
+    for start in range(index.size, store.count, batch_size):
+        index.add([store.text(row) for row in range(start, min(start + batch_size, store.count))])
+    return True
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index(store):
+    """Loads the lexical index once per process and keeps it level with the store."""
+    global _index
+    with _index_lock:
+        if _index is None or (_index.directory, _index.generation) != (store.directory, store.generation):
+            _index = LexicalIndex.load(store.generation, store.directory)
+        if _index is None or _index.size > store.count:
+            _index = LexicalIndex(store.generation, store.directory)
+        if sync_lexical_index(_index, store):
+            _index.save()
+        return _index
+
+
+def reciprocal_rank_fusion(rankings, top_k=3, k=RRF_K):
+    """Fuses (chunk_id, score, text) rankings into one by summed 1 / (k + rank)."""
+    fused, texts = {}, {}
+    for ranking in rankings:
+        for rank, (chunk_id, _, text) in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1 / (k + rank)
+            texts[chunk_id] = text
+    best = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [(chunk_id, fused[chunk_id], texts[chunk_id]) for chunk_id in best]
+
+
+def hybrid_search(vector_store, store, query, query_vector, top_k=3, budget_ms=HYBRID_BUDGET_MS):
+    """Dense hits from `vector_store` fused with BM25 hits over the embedding `store`'s rows."""
+    deadline = time.perf_counter() + budget_ms / 1000
+    dense = vector_store.search(query_vector, HYBRID_CANDIDATES)
+    if time.perf_counter() > deadline:
+        return dense[:top_k]  # No time left for the lexical side
+    lexical = [
+        (store.chunk_id(row), score, store.text(row))
+        for row, score in get_lexical_index(store).search(query, HYBRID_CANDIDATES, deadline)
+    ]
+    return reciprocal_rank_fusion([dense, lexical], top_k)
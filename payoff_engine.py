@@ -0,0 +1,480 @@
+import math
+import numpy as np
+from datetime import datetime
+
+from tracing import traced
+
+# ======================
+# ⚙️ Event-driven Payoff Engine
+# ======================
+# Between two payoff events nothing about a portfolio changes shape: each
+# open debt pays its minimum (the strategy's target also takes the whole
+# extra budget), so its balance follows the amortization recurrence
+# b' = b * (1 + r) - payment, whose k-month closed form is cheap. The engine
+# solves for the next event, jumps there and steps the event month with the
+# original arithmetic, so payoff months and order match
+# `calculate_debt_payoff_reference` and interest agrees to rounding.
+
+PAID_TOLERANCE = 0.01  # Floating point tolerance
+EVENT_SLACK = 1e-6  # Relative error allowed in a solved event month
+# Payments within this share of the interest leave a balance where it is. A
+# debt that creeps down onto the balance whose interest equals its minimum
+# lands there in exact arithmetic and would stay forever; the loop's rounding
+# leaves it a hair above and bumps it once more, so it does too
+LEVEL_TOLERANCE = 1e-12
+
+
+def strategy_order(debts, strategy, stress_level):
+    """Returns debt indices in the order extra payments are applied."""
+    if strategy == "Avalanche Assault":
+        key = lambda x: (-x['apr'], x['balance'])
+    elif strategy == "Snowball Charge":
+        key = lambda x: (x['balance'], -x['apr'])
+    else:
+        stress_factor = {"Calm": 0.2, "Tense": 0.5, "Panic": 0.8}[stress_level]
+        threshold = sum(d['balance'] for d in debts) * stress_factor / len(debts)
+        # Large debts first, highest APR first; then small debts, smallest first
+        key = lambda x: (
+            (0, -x['apr'], x['balance']) if x['balance'] > threshold else (1, x['balance'], -x['apr'])
+        )
+    return sorted(range(len(debts)), key=lambda i: key(debts[i]))
+
+
+def select_strategy(debts, motivation, stress_level):
+    """Selects a debt repayment strategy based on user motivation and stress level."""
+    if motivation == "Quick Strikes":
+        return "Avalanche Assault"  # Pay off high-interest debts first
+    elif motivation == "Long Campaign":
+        return "Snowball Charge"  # Pay off smaller debts first
+    else:
+        # Stress level can influence the strategy
+        if stress_level == "Calm":
+            return "Avalanche Assault"
+        elif stress_level == "Tense":
+            return "Snowball Charge"
+        else:  # Panic
+            # Mix of strategy for quick wins and long-term control
+            return "Hybrid Strategy"
+
+
+def _prepare(debts):
+    """Copies the debts with float balances, as the original calculator does."""
+    debts = [d.copy() for d in debts]
+    for d in debts:
+        d['balance'] = float(d['balance'])
+    return debts
+
+
+class _PayoffLog:
+    """Records payoff events the same way the original loop does."""
+
+    def __init__(self, debts, name_slot, num_names):
+        self.debts = debts
+        self.name_slot = name_slot
+        self.paid_month = [None] * num_names
+        self.payoff_plan = []
+
+    def close_month(self, months, paid, balance):
+        paid_this_month = []
+        for i in paid:
+            slot = self.name_slot[i]
+            if not self.paid_month[slot]:
+                paid_this_month.append(self.debts[i]['name'])
+                self.paid_month[slot] = months
+        if paid_this_month:
+            self.payoff_plan.append({
+                'month': months,
+                'paid_debts': paid_this_month,
+                'remaining_debt': sum(balance.tolist() if isinstance(balance, np.ndarray) else balance)
+            })
+
+
+def _pay_extra(balance, pos, order, start, extra_budget):
+    """Applies the extra budget in strategy order.
+
+    Balances never grow, so a debt at or below the tolerance stays closed and
+    the scan resumes from the first open debt of the previous month. Returns
+    that position and the debts that dropped below the tolerance.
+    """
+    while start < len(order) and (pos[order[start]] < 0 or balance[pos[order[start]]] <= PAID_TOLERANCE):
+        start += 1
+    paid = []
+    remaining_extra = extra_budget
+    k = start
+    while remaining_extra > 0 and k < len(order):
+        i = order[k]
+        p = pos[i]
+        k += 1
+        if p < 0 or balance[p] <= PAID_TOLERANCE:
+            continue
+        possible_payment = min(remaining_extra, balance[p])
+        balance[p] -= possible_payment
+        remaining_extra -= possible_payment
+        if balance[p] <= PAID_TOLERANCE:
+            paid.append(i)
+    return start, paid
+
+
+def _horizon(b, rate, m, e, crept=False):
+    """Months, possibly fractional, until a debt closes or changes regime; inf if it never will.
+
+    `e` is the extra payment it receives each month (the whole extra budget
+    if it is the strategy's current target, else zero); `crept` says it was
+    bumped last month. A debt at or below the tolerance still owes its last
+    cents and is followed down to zero.
+    """
+    if b <= 0:
+        return math.inf
+    floor = PAID_TOLERANCE if b > PAID_TOLERANCE else 0.0
+    interest = b * rate
+    if m >= b + interest:
+        return 1.0  # Cleared by this month's minimum
+    if m < interest or (crept and m < interest * (1 + LEVEL_TOLERANCE)):
+        # The loop bumps the payment to interest + 0.01, so the balance creeps
+        # down linearly until interest falls to the minimum
+        creep = 0.01 + e
+        return min((b - floor) / creep, (b - m / rate) / creep)
+    outflow = m + e
+    if rate == 0:
+        return (b - floor) / outflow if outflow > 0 else math.inf
+    if outflow - interest <= LEVEL_TOLERANCE * outflow:
+        return math.inf  # Payments match interest: the balance never moves
+    # b_k = level + (b - level) * (1 + rate)^k, solved for b_k = floor
+    level = outflow / rate
+    return math.log((level - floor) / (level - b)) / math.log1p(rate)
+
+
+def _advance(b, rate, m, e, k):
+    """Balances and interest charged after `k` months in which no debt closes or changes regime."""
+    outflow = m + e
+    creep = 0.01 + e
+    stuck = m < b * rate
+    # b_k = level + (b - level) * (1 + rate)^k with level = outflow / rate; the
+    # gap to the level only shrinks the balance when it is paying down, so the
+    # growth factor is applied to it alone and stays within the horizon
+    amortizing = (rate > 0) & ~stuck & (b > 0) & (outflow - b * rate > LEVEL_TOLERANCE * outflow)
+    level = outflow / np.where(rate > 0, rate, 1.0)
+    growth = np.exp(np.where(amortizing, k * np.log1p(rate), 0.0))
+    after = np.where(amortizing, level + (b - level) * growth, b)
+    after = np.where(rate > 0, after, b - k * outflow)  # k payments at zero rate
+    # Everything paid that didn't reduce principal was interest
+    interest = k * outflow - (b - after)
+    after = np.where(stuck, b - k * creep, after)
+    interest = np.where(stuck, rate * (k * b - creep * k * (k - 1) / 2), interest)
+    live = b > 0
+    return np.where(live, after, b), np.where(live, interest, 0.0)
+
+
+def _step_month(b, apr, m, crept):
+    """One month of minimum payments, with the original loop's arithmetic.
+
+    Returns the interest charged and which debts were bumped to interest + 0.01.
+    """
+    active = b > 0
+    interest = np.where(active, b * apr / 1200, 0.0)
+    owed = b + interest
+    payment = np.minimum(m, owed)
+    # Ensure payment covers at least interest; a debt that crept onto its level is bumped past it
+    bump = active & ((payment < interest) | (crept & (payment < interest * (1 + LEVEL_TOLERANCE))))
+    payment = np.where(bump, np.minimum(interest + 0.01, owed), payment)
+    b[:] = np.where(active, b - (payment - interest), b)
+    return interest, bump
+
+
+def _solve_events(balance, apr, min_emi, order, extra_budget, log):
+    """Event-driven solver: jumps analytically between payoff events.
+
+    Between events every open debt follows a fixed recurrence, so its balance
+    and interest after k months have a closed form. The solver jumps to the
+    month before the earliest event and steps the event month itself exactly,
+    so payoffs land on the same months as the loop.
+
+    Each debt's next event month is cached and only re-solved when its
+    recurrence changes: it becomes or stops being the extra-payment target,
+    it is paid in an exact month, or its own event comes due. Cost is
+    O(debts) per event instead of per month. Returns (months, interest per
+    debt, converged, first payoff month); converged is False when the
+    remaining balances can never be paid off.
+    """
+    n = len(balance)
+    b = np.array(balance, dtype=np.float64)
+    apr = np.array(apr, dtype=np.float64)
+    rate = apr / 1200
+    m = np.array(min_emi, dtype=np.float64)
+    e = np.zeros(n)  # Extra payment per debt: the whole budget, on the current target
+    crept = np.zeros(n, dtype=bool)  # Bumped to interest + 0.01 last month
+    interest_total = np.zeros(n)
+    due = np.full(n, np.inf)  # Month of each debt's next event
+    stale = set(range(n))
+    pos = list(range(n))
+    start = 0
+    target = None
+    months = 0
+    first_payoff = None
+    owing = b > PAID_TOLERANCE  # Debts a payoff can still be celebrated for
+    while b.max(initial=0.0) > PAID_TOLERANCE:
+        if extra_budget > 0:
+            current = next((i for i in order[start:] if b[i] > PAID_TOLERANCE), None)
+            if current != target:
+                for i in (target, current):
+                    if i is not None:
+                        e[i] = extra_budget if i == current else 0.0
+                        stale.add(i)
+                target = current
+        for i in stale:
+            due[i] = months + _horizon(float(b[i]), float(rate[i]), float(m[i]), float(e[i]), bool(crept[i]))
+        stale.clear()
+
+        quiet = due.min() - months
+        if quiet == np.inf:
+            return months, interest_total, False, first_payoff
+
+        # Stop the month before; the slack keeps rounding from skipping an event month
+        jump = math.ceil(quiet - EVENT_SLACK * (1 + quiet)) - 1
+        if jump >= 1:
+            crept = (m < b * rate) & (b > 0)
+            b, interest = _advance(b, rate, m, e, jump)
+            interest_total += interest
+            months += jump
+            continue
+
+        months += 1
+        interest, crept = _step_month(b, apr, m, crept)
+        interest_total += interest
+        if extra_budget > 0:
+            start, paid = _pay_extra(b, pos, order, start, extra_budget)
+            if paid:
+                log.close_month(months, paid, b)
+                stale.update(paid)
+        if first_payoff is None and (owing & (b <= PAID_TOLERANCE)).any():
+            first_payoff = months  # By minimum or extra payments; jumps never close a debt
+        stale.update(np.flatnonzero(due < months + EVENT_SLACK * (1 + months)).tolist())
+    return months, interest_total, True, first_payoff
+
+
+def find_diverging_debts(debts):
+    """Names of debts whose minimum EMI doesn't cover their monthly interest.
+
+    The month-by-month loop only shaves 0.01 a month off such a debt until
+    extra payments reach it, which for practical purposes is forever.
+    """
+    return [
+        d['name'] for d in debts
+        if d['balance'] > PAID_TOLERANCE and d['min_emi'] <= d['balance'] * d['apr'] / 1200
+    ]
+
+
+@traced("payoff.solve")
+def calculate_debt_payoff(debts, strategy, available_emi, stress_level, order=None):
+    """Event-driven payoff calculator with precise tracking.
+
+    Besides the reference loop's fields, reports `diverging_debts` (minimums
+    that don't cover interest, found before solving), `converged`, False
+    when some balance can never be paid off (`months` then stops at the last
+    payoff that does happen), and `first_payoff_month`, when the first debt
+    is cleared by any payment. `order`, debt indices in attack order,
+    overrides the strategy's ordering.
+    """
+    debts = _prepare(debts)
+    diverging = find_diverging_debts(debts)
+
+    total_min = sum(d['min_emi'] for d in debts)
+    extra_budget = max(available_emi - total_min, 0)  # Ensure non-negative
+    if order is None:
+        order = strategy_order(debts, strategy, stress_level)
+
+    # Debts sharing a name share a tracker entry, exactly like the dict version
+    names = list(dict.fromkeys(d['name'] for d in debts))
+    slot_by_name = {name: slot for slot, name in enumerate(names)}
+    name_slot = [slot_by_name[d['name']] for d in debts]
+    log = _PayoffLog(debts, name_slot, len(names))
+
+    months, interest_total, converged, first_payoff = _solve_events(
+        [d['balance'] for d in debts],
+        [float(d['apr']) for d in debts],
+        [float(d['min_emi']) for d in debts],
+        order, extra_budget, log
+    )
+    tracker = np.bincount(name_slot, weights=interest_total, minlength=len(names))
+
+    debt_tracker = {
+        name: {'paid_month': log.paid_month[slot], 'total_interest': float(tracker[slot])}
+        for slot, name in enumerate(names)
+    }
+    return {
+        'total_interest': float(interest_total.sum()),
+        'months': months,
+        'payoff_plan': log.payoff_plan,
+        'debt_tracker': debt_tracker,
+        'converged': converged,
+        'diverging_debts': diverging,
+        'first_payoff_month': first_payoff
+    }
+
+
+def calculate_debt_payoff_reference(debts, strategy, available_emi, stress_level):
+    """The original month-by-month dict loop, kept for equivalence checks and benchmarks.
+
+    Debts are ordered by the current `strategy_order`, so Hybrid follows the
+    reworked sort key rather than the original one.
+    """
+    debts = _prepare(debts)
+    for d in debts:
+        d['total_interest'] = 0.0
+
+    total_min = sum(d['min_emi'] for d in debts)
+    extra_budget = max(available_emi - total_min, 0)  # Ensure non-negative
+
+    # Strategy sorting
+    ordered_debts = [debts[i] for i in strategy_order(debts, strategy, stress_level)]
+
+    payoff_plan = []
+    months = 0
+    debt_tracker = {d['name']: {'paid_month': None, 'total_interest': 0.0} for d in debts}
+    current_date = datetime.now()
+
+    while any(d['balance'] > 0.01 for d in debts):  # Floating point tolerance
+        months += 1
+        monthly_interest = 0
+        paid_this_month = []
+
+        # Process minimum payments
+        for d in debts:
+            if d['balance'] <= 0:
+                continue
+
+            interest = d['balance'] * d['apr']/1200
+            payment = min(d['min_emi'], d['balance'] + interest)
+
+            # Ensure payment covers at least interest
+            if payment < interest:
+                payment = min(interest + 0.01, d['balance'] + interest)
+
+            principal = payment - interest
+            d['balance'] -= principal
+            d['total_interest'] += interest
+            debt_tracker[d['name']]['total_interest'] += interest
+            monthly_interest += interest
+
+        # Process extra payments
+        remaining_extra = extra_budget
+        for d in ordered_debts:
+            if d['balance'] <= 0.01 or remaining_extra <= 0:
+                continue
+
+            possible_payment = min(remaining_extra, d['balance'])
+            d['balance'] -= possible_payment
+            remaining_extra -= possible_payment
+
+            if d['balance'] <= 0.01 and not debt_tracker[d['name']]['paid_month']:
+                paid_this_month.append(d['name'])
+                debt_tracker[d['name']]['paid_month'] = months
+
+        # Track payoff progress
+        if paid_this_month:
+            payoff_plan.append({
+                'month': months,
+                'paid_debts': paid_this_month,
+                'remaining_debt': sum(d['balance'] for d in debts)
+            })
+
+    return {
+        'total_interest': sum(d['total_interest'] for d in debts),
+        'months': months,
+        'payoff_plan': payoff_plan,
+        'debt_tracker': debt_tracker
+    }
+
+
+# ======================
+# 📊 Batch Scenario Simulator
+# ======================
+STRATEGIES = ["Avalanche Assault", "Snowball Charge", "Hybrid Strategy"]
+MAX_SIMULATED_MONTHS = 1200  # Scenarios still open after 100 years are reported as not converged
+
+
+@traced("payoff.sweep")
+def simulate_scenarios(debts, scenarios, stress_level, max_months=MAX_SIMULATED_MONTHS):
+    """Simulates many (strategy, available_emi) scenarios for one portfolio in a single pass.
+
+    Balances are held as a (scenario x debt) array. Each month applies the
+    minimum payments to every scenario at once, then spreads each scenario's
+    extra budget down its own strategy order with a cumulative sum. Returns
+    one dict per scenario with months, total interest and payoff order.
+    """
+    debts = _prepare(debts)
+    names = [d['name'] for d in debts]
+    num_scenarios, num_debts = len(scenarios), len(debts)
+    total_min = sum(d['min_emi'] for d in debts)
+
+    # Each scenario row keeps its debts in its own strategy order, so the
+    # extra budget always flows left to right and no per-month reordering is needed
+    orders = {strategy: strategy_order(debts, strategy, stress_level) for strategy, _ in scenarios}
+    order = np.array([orders[strategy] for strategy, _ in scenarios], dtype=np.intp).reshape(num_scenarios, num_debts)
+    b = np.array([d['balance'] for d in debts], dtype=np.float64)[order]
+    apr = np.array([d['apr'] for d in debts], dtype=np.float64)[order]
+    min_emi = np.array([d['min_emi'] for d in debts], dtype=np.float64)[order]
+    extra = np.array([[max(emi - total_min, 0)] for _, emi in scenarios], dtype=np.float64).reshape(num_scenarios, 1)
+
+    interest_total = np.zeros(num_scenarios)
+    months = np.zeros(num_scenarios, dtype=np.int64)
+    paid_month = np.zeros((num_scenarios, num_debts), dtype=np.int64)  # 0 = never marked paid, in ranked order
+    converged = np.ones(num_scenarios, dtype=bool)
+
+    rows = np.arange(num_scenarios)
+    open_rows = (b > PAID_TOLERANCE).any(axis=1)
+    rows, b, apr, min_emi, extra = rows[open_rows], b[open_rows], apr[open_rows], min_emi[open_rows], extra[open_rows]
+    paid = paid_month[rows]
+    month = 0
+    while rows.size and month < max_months:
+        month += 1
+
+        # Process minimum payments for every scenario and open debt at once
+        active = b > 0
+        interest = np.where(active, b * apr / 1200, 0.0)
+        owed = b + interest
+        payment = np.minimum(min_emi, owed)
+        payment = np.where(payment < interest, np.minimum(interest + 0.01, owed), payment)
+        b = np.where(active, b - (payment - interest), b)
+        interest_total[rows] += interest.sum(axis=1)
+
+        # Spread each scenario's extra budget down its strategy order
+        open_debt = b > PAID_TOLERANCE
+        owed_extra = np.where(open_debt, b, 0.0)
+        before = np.cumsum(owed_extra, axis=1) - owed_extra
+        extra_payment = np.clip(extra - before, 0.0, owed_extra)
+        b = b - extra_payment
+        newly_paid = open_debt & (extra_payment > 0) & (b <= PAID_TOLERANCE) & (paid == 0)
+        paid[newly_paid] = month
+
+        months[rows] = month
+        finished = ~(b > PAID_TOLERANCE).any(axis=1)
+        if finished.any():
+            paid_month[rows[finished]] = paid[finished]
+            keep = ~finished
+            rows, b, apr, min_emi, extra, paid = rows[keep], b[keep], apr[keep], min_emi[keep], extra[keep], paid[keep]
+
+    paid_month[rows] = paid
+    converged[rows] = False
+
+    results = []
+    for s, (strategy, emi) in enumerate(scenarios):
+        ranks = [r for r in range(num_debts) if paid_month[s, r]]
+        ranks.sort(key=lambda r: (paid_month[s, r], r))
+        results.append({
+            'strategy': strategy,
+            'emi': emi,
+            'months': int(months[s]),
+            'total_interest': float(interest_total[s]),
+            'payoff_order': [names[order[s, r]] for r in ranks],
+            'converged': bool(converged[s])
+        })
+    return results
+
+
+def emi_sweep(debts, max_emi, stress_level, step=50, strategies=STRATEGIES):
+    """Every EMI from the total minimum up to `max_emi` in `step` increments, across strategies."""
+    total_min = sum(d['min_emi'] for d in debts)
+    emis = np.arange(total_min, max(max_emi, total_min) + step / 2, step).tolist()
+    scenarios = [(strategy, emi) for strategy in strategies for emi in emis]
+    return simulate_scenarios(debts, scenarios, stress_level)
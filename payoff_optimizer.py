@@ -0,0 +1,248 @@
+import heapq
+import math
+import os
+import time
+
+from payoff_engine import PAID_TOLERANCE, STRATEGIES, _prepare, calculate_debt_payoff, strategy_order
+from tracing import traced
+
+# ======================
+# 🎯 Attack Order Optimizer
+# ======================
+# The engine spends the whole extra budget on one target debt at a time, so
+# an allocation is an attack order, and splitting the extra between debts
+# never beats concentrating it. Instead of the three fixed orderings, orders
+# are searched depth-first with branch and bound on a continuous-time model
+# in which extending an order costs O(1):
+#
+#   - a debt that isn't the target amortizes on its minimum alone, so its
+#     balance at any time t has a closed form that doesn't depend on the order
+#   - a debt attacked from time t is cleared after the closed-form time for
+#     its balance at t under minimum + extra
+#   - total payments are sum(min_emi * months open) + extra * months, so
+#     interest is that minus the principal
+#
+# The fixed strategies' orders are first improved by moving one debt at a
+# time. The search then prunes a partial order when every remaining debt
+# cleared as early as it could possibly be (attacked right now, or by its own
+# minimum) can't beat the best order found, or when the same debts were
+# already cleared sooner and cheaper. The best few orders are re-scored with
+# the exact engine.
+
+OBJECTIVES = ("interest", "months")
+OPTIMIZER_BUDGET_MS = float(os.getenv("OPTIMIZER_BUDGET_MS", 120))  # Whole call, re-scoring included; the best order so far is kept
+RESCORE_ORDERS = 5  # Orders from the model re-scored with the exact engine
+CREEP = 0.01  # Monthly principal the engine forces on a debt whose payment doesn't cover interest
+
+
+def _balance_at(b, rate, m, t):
+    """Balance after `t` months of minimum payments only."""
+    if t <= 0:
+        return b
+    if m < b * rate:
+        return max(b - CREEP * t, 0.0)
+    if rate == 0:
+        return max(b - m * t, 0.0)
+    level = m / rate
+    return max(level + (b - level) * math.exp(t * math.log1p(rate)), 0.0)
+
+
+def _clear_time(b, rate, m, e):
+    """Months until `m + e` a month clears `b`."""
+    if b <= PAID_TOLERANCE:
+        return 0.0
+    if m < b * rate:
+        return b / (CREEP + e)
+    if rate == 0:
+        return b / (m + e) if m + e > 0 else math.inf
+    level = (m + e) / rate
+    if level <= b:
+        return math.inf
+    return math.log(level / (level - b)) / math.log1p(rate)
+
+
+class _OrderModel:
+    """Continuous-time payoff model of a portfolio under any attack order."""
+
+    def __init__(self, debts, extra):
+        self.balance = [d['balance'] for d in debts]
+        self.rate = [d['apr'] / 1200 for d in debts]
+        self.min_emi = [float(d['min_emi']) for d in debts]
+        self.extra = extra
+        self.principal = sum(self.balance)
+        # When each debt would be cleared by its own minimum, whatever the order
+        self.self_cleared = [_clear_time(b, r, m, 0.0) for b, r, m in zip(self.balance, self.rate, self.min_emi)]
+
+    def attack(self, i, t):
+        """Time debt `i` is cleared if it becomes the target at time `t`."""
+        if self.self_cleared[i] <= t:
+            return self.self_cleared[i]
+        b = _balance_at(self.balance[i], self.rate[i], self.min_emi[i], t)
+        return t + _clear_time(b, self.rate[i], self.min_emi[i], self.extra)
+
+    def cost(self, objective, paid, end):
+        """`paid` is sum(min_emi * clear time) over debts; `end` the last clear time."""
+        if objective == "months":
+            return end
+        return paid + self.extra * end - self.principal
+
+    def evaluate(self, order):
+        """(cost per objective, first payoff time) of a complete order."""
+        t = paid = 0.0
+        cleared = [0.0] * len(order)
+        for i in order:
+            cleared[i] = self.attack(i, t)
+            t = max(t, cleared[i])
+            paid += self.min_emi[i] * cleared[i]
+        return {objective: self.cost(objective, paid, t) for objective in OBJECTIVES}, min(cleared, default=0.0)
+
+
+def _local_search(model, objective, order, feasible, deadline):
+    """Moves one debt at a time to another position while that lowers the cost."""
+    cost = model.evaluate(order)[0][objective]
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for src in range(len(order)):
+            for dst in range(len(order)):
+                if src == dst:
+                    continue
+                moved = order[:src] + order[src + 1:]
+                moved.insert(dst, order[src])
+                costs, first = model.evaluate(moved)
+                if costs[objective] < cost and feasible(first):
+                    order, cost, improved = moved, costs[objective], True
+                    break
+            if time.perf_counter() > deadline:
+                break
+    return cost, order
+
+
+def _search(model, objective, seeds, first_payoff_within, deadline):
+    """Local search from the seed orders, then branch and bound with the time left.
+
+    Returns ([(cost, order)] best first, exhaustive).
+    """
+    n = len(model.balance)
+    best = []  # Max-heap by cost (negated) of the RESCORE_ORDERS best complete orders
+    seen = set()
+    incumbent = math.inf
+
+    def offer(cost, order):
+        nonlocal incumbent
+        key = tuple(order)
+        if key in seen:
+            return
+        seen.add(key)
+        incumbent = min(incumbent, cost)
+        heapq.heappush(best, (-cost, key))
+        if len(best) > RESCORE_ORDERS:
+            heapq.heappop(best)
+
+    first_self = min(model.self_cleared, default=math.inf)
+
+    def feasible(first):
+        return first_payoff_within is None or min(first, first_self) <= first_payoff_within
+
+    # Half the budget polishes the seeds, so a cut-off search still returns a good order
+    polish_deadline = time.perf_counter() + (deadline - time.perf_counter()) / 2
+    for order in seeds:
+        costs, first = model.evaluate(order)
+        if feasible(first):
+            offer(costs[objective], order)
+            offer(*_local_search(model, objective, list(order), feasible, polish_deadline))
+
+    dominated = {}  # Remaining debts -> [(t, paid)] states already expanded
+    exhaustive = True
+
+    def expand(prefix, remaining, t, paid):
+        nonlocal exhaustive
+        if time.perf_counter() > deadline:
+            exhaustive = False
+            return
+        # Debts already cleared by their own minimum need no attack
+        done = [i for i in remaining if model.self_cleared[i] <= t]
+        if done:
+            paid += sum(model.min_emi[i] * model.self_cleared[i] for i in done)
+            remaining = [i for i in remaining if model.self_cleared[i] > t]
+            prefix = prefix + done
+        if not remaining:
+            offer(model.cost(objective, paid, t), prefix)
+            return
+
+        # Lower bound: each remaining debt cleared as early as it possibly could be
+        earliest = [model.attack(i, t) for i in remaining]
+        lower = model.cost(objective, paid + sum(model.min_emi[i] * c for i, c in zip(remaining, earliest)),
+                           max(earliest))
+        if lower >= incumbent:
+            return
+        states = dominated.setdefault(frozenset(remaining), [])
+        if any(t0 <= t and (objective == "months" or p0 <= paid) for t0, p0 in states):
+            return
+        states.append((t, paid))
+
+        # Smith's rule first (most minimum payment freed per month of attack),
+        # which is near optimal for the weighted clear times behind interest
+        children = sorted(zip(earliest, remaining), key=lambda c: -model.min_emi[c[1]] / max(c[0] - t, 1e-9))
+        for cleared, i in children:
+            if not prefix and not feasible(cleared):
+                continue  # The first win would come too late
+            rest = [j for j in remaining if j != i]
+            expand(prefix + [i], rest, cleared, paid + model.min_emi[i] * cleared)
+
+    expand([], list(range(n)), 0.0, 0.0)
+    return sorted((-cost, list(order)) for cost, order in best), exhaustive
+
+
+@traced("payoff.optimize")
+def optimize_order(debts, available_emi, stress_level, objective="interest", first_payoff_within=None,
+                   budget_ms=OPTIMIZER_BUDGET_MS):
+    """Attack order minimizing total interest or months, optionally with a first payoff by a given month.
+
+    Returns a dict with the order (debt names), its exact payoff result, the
+    exact results of the fixed strategies for comparison, and whether the
+    search finished within `budget_ms` (otherwise the order is the best found).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}, expected one of {OBJECTIVES}")
+    started = time.perf_counter()
+    debts = _prepare(debts)
+    extra = max(available_emi - sum(d['min_emi'] for d in debts), 0)
+    model = _OrderModel(debts, extra)
+
+    # The fixed strategies are scored first: they are the baselines, stay in
+    # the running (so the result never loses to them) and time the exact engine
+    baselines = {strategy: calculate_debt_payoff(debts, strategy, available_emi, stress_level)
+                 for strategy in STRATEGIES}
+    seeds = [strategy_order(debts, strategy, stress_level) for strategy in STRATEGIES]
+    rescore_seconds = (time.perf_counter() - started) / len(STRATEGIES) * RESCORE_ORDERS
+    if extra > 0 and len(debts) > 1:
+        # The search stops in time for its orders to be re-scored within the budget
+        candidates, exhaustive = _search(model, objective, seeds, first_payoff_within,
+                                         started + budget_ms / 1000 - rescore_seconds)
+    else:
+        candidates, exhaustive = [], True  # Without extra payments every order is the same
+
+    def score(result):
+        return result['total_interest'] if objective == "interest" else result['months']
+
+    def feasible(result):
+        first = result['first_payoff_month']
+        return first_payoff_within is None or (first is not None and first <= first_payoff_within)
+
+    # The model is continuous; the exact engine settles the ranking and the constraint
+    scored = list(zip(seeds, baselines.values()))
+    scored += [(order, calculate_debt_payoff(debts, None, available_emi, stress_level, order=order))
+               for _, order in candidates if all(order != seed for seed in seeds)]
+    if not any(feasible(result) for _, result in scored):
+        raise ValueError(f"No attack order pays off a debt within {first_payoff_within} months")
+    order, result = min(((o, r) for o, r in scored if feasible(r)), key=lambda item: score(item[1]))
+
+    return {
+        'order': [debts[i]['name'] for i in order],
+        'objective': objective,
+        'result': result,
+        'baselines': baselines,
+        'exhaustive': exhaustive,
+        'seconds': time.perf_counter() - started
+    }
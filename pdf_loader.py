@@ -0,0 +1,136 @@
+import multiprocessing
+import os
+import time
+from queue import Empty
+
+from langchain_community.document_loaders import PDFPlumberLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from tracing import record, traced
+
+# ======================
+# 📚 PDF Loading & Chunking
+# ======================
+# Kept free of the embedding model and database client so pool workers can
+# import it cheaply. Stages traced inside pool workers stay in the workers;
+# ingest with workers=1 to see "pdf.page" and "pdf.chunk" in the trace.
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count() or 1))
+
+
+def list_pdfs(directory):
+    return sorted(
+        os.path.join(directory, filename)
+        for filename in os.listdir(directory)
+        if filename.endswith(".pdf")
+    )
+
+
+def load_pdfs_from_directory(directory):
+    documents = []
+    for file_path in list_pdfs(directory):
+        loader = PDFPlumberLoader(file_path)
+        documents.extend(loader.load())
+    return documents
+
+
+@traced("pdf.chunk")
+def create_chunks(documents):
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        add_start_index=True
+    )
+    text_chunks = text_splitter.split_documents(documents)
+    return text_chunks
+
+
+def iter_pages(file_path):
+    """Yields one Document per page; pdfplumber only parses a page when it is reached."""
+    started = time.perf_counter()
+    pages = PDFPlumberLoader(file_path).lazy_load()
+    while (page := next(pages, None)) is not None:
+        # Parse time only, not the consumer's; a loader that parses up front bills it all to page one
+        record("pdf.page", (time.perf_counter() - started) * 1000)
+        yield page
+        started = time.perf_counter()
+
+
+def iter_page_chunks(pages):
+    """Chunks page by page. `start_index` is per page, so this matches `create_chunks`."""
+    for page in pages:
+        yield create_chunks([page])
+
+
+_queue = None
+
+
+def _init_worker(queue):
+    global _queue
+    _queue = queue
+
+
+def _stream_file(file_path):
+    """Pool task: pushes a file's chunks onto the shared queue one page at a time.
+
+    `put` blocks while the queue is full, so a worker can never run further
+    ahead of the consumer than the queue allows.
+    """
+    try:
+        for page_chunks in iter_page_chunks(iter_pages(file_path)):
+            _queue.put((file_path, page_chunks))
+        _queue.put((file_path, None))
+    except Exception as e:
+        _queue.put((file_path, e))
+
+
+def iter_chunked_pages(file_paths, workers=INGEST_WORKERS, max_pending_pages=None):
+    """Yields (file_path, page_chunks) as pages are chunked, then (file_path, None) once a file is done.
+
+    PDFs are parsed concurrently across processes and stream back through a
+    bounded queue, so memory stays flat however many PDFs there are: only
+    the pages in the queue and the one each worker is parsing are alive.
+    Pages from different files interleave; pages of one file stay in order.
+    """
+    file_paths = list(file_paths)
+    workers = max(1, min(workers, len(file_paths)))
+    if workers == 1:
+        for file_path in file_paths:
+            for page_chunks in iter_page_chunks(iter_pages(file_path)):
+                yield file_path, page_chunks
+            yield file_path, None
+        return
+
+    # Spawn rather than fork: the parent may already hold the embedding model's threads
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue(maxsize=max_pending_pages or 4 * workers)
+    pool = context.Pool(workers, initializer=_init_worker, initargs=(queue,))
+    try:
+        tasks = [pool.apply_async(_stream_file, (file_path,)) for file_path in file_paths]
+        remaining = len(file_paths)
+        while remaining:
+            try:
+                file_path, item = queue.get(timeout=1)
+            except Empty:
+                if all(task.ready() for task in tasks) and queue.empty():
+                    raise RuntimeError("A PDF worker exited without finishing its file")
+                continue
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                remaining -= 1
+            yield file_path, item
+    finally:
+        # Workers may be blocked on a full queue if the consumer stopped early
+        pool.terminate()
+        pool.join()
+
+
+def iter_chunked_files(file_paths, workers=INGEST_WORKERS):
+    """Yields (file_path, chunks) per file, in completion order, built from the page stream."""
+    pending = {}
+    for file_path, page_chunks in iter_chunked_pages(file_paths, workers):
+        if page_chunks is None:
+            yield file_path, pending.pop(file_path, [])
+        else:
+            pending.setdefault(file_path, []).extend(page_chunks)
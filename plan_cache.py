@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+import threading
+
+from cachetools import LRUCache
+
+# ======================
+# 🗂️ Plan Cache
+# ======================
+# Every widget change reruns the Streamlit script top to bottom. A battle
+# plan (both payoff simulations, the EMI sweep, the stress test and the
+# optimized order) depends only on the debts, the EMI, the strategy and the
+# stress level, so it is memoized under a canonical hash of those. Each
+# session keeps its own bounded LRU in `st.session_state`: reruns and repeat
+# clicks skip the work, and sessions never read or evict each other's plans.
+
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", 16))  # Plans kept per session
+
+
+def plan_key(debts, available_emi, strategy, stress_level):
+    """Hash of a plan's inputs; int vs float amounts and unrelated debt fields don't change it."""
+    canonical = {
+        "debts": [
+            [str(d['name']), float(d['balance']), float(d['apr']), float(d['min_emi']), d.get('variable')]
+            for d in debts
+        ],
+        "emi": float(available_emi),
+        "strategy": strategy,
+        "stress": stress_level
+    }
+    return hashlib.sha256(json.dumps(canonical, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Bounded LRU of battle plans for one session."""
+
+    def __init__(self, maxsize=PLAN_CACHE_SIZE):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key):
+        with self.lock:
+            plan = self.memory.get(key)
+            self.stats["misses" if plan is None else "hits"] += 1
+            return plan
+
+    def set(self, key, plan):
+        with self.lock:
+            self.memory[key] = plan
@@ -0,0 +1,144 @@
+import os
+import threading
+
+import numpy as np
+
+from embedding_store import normalize, top_k_rows
+
+# ======================
+# 🗜️ Quantized Scoring
+# ======================
+# With EMBEDDING_QUANTIZATION set, queries are scored against compact codes
+# first and only a shortlist is re-scored against the full-precision store
+# rows, so the only memory that stays hot is the codes and the mapped
+# matrix is touched a few rows at a time. Codes are FAISS flat code indexes,
+# whose distance kernels are SIMD:
+#
+#   int8  8-bit scalar quantization, one byte per dimension (4x smaller
+#         than float32)
+#   pq    4-bit fast-scan product quantization, PQ_SUBVECTORS / 2 bytes per
+#         row (32x smaller at the defaults)
+#
+# Codes are derived data saved next to the store, one file per generation,
+# and caught up with new store rows the same way as the HNSW graph.
+
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "none")
+QUANTIZATIONS = ("none", "int8", "pq")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 100))  # Shortlist re-scored at full precision
+PQ_SUBVECTORS = 96  # 384 dims / 96 = 4 dims per 4-bit code
+FACTORIES = {"int8": "SQ8", "pq": f"PQ{PQ_SUBVECTORS}x4fs"}
+MIN_ROWS = {"int8": 1, "pq": 1_000}  # Fewer rows can't train a codebook; scan exactly instead
+TRAIN_ROWS = 16_384
+SYNC_BATCH_SIZE = 50_000
+CODES_FILE = "codes-{generation}.{kind}.faiss"
+
+
+class QuantizedCodes:
+    """A trained FAISS code index whose rows line up with the embedding store."""
+
+    def __init__(self, kind, index, generation=0, directory=None):
+        self.kind = kind
+        self.index = index
+        self.generation = generation
+        self.directory = directory
+
+    @classmethod
+    def train(cls, kind, vectors, generation=0, directory=None):
+        import faiss
+
+        index = faiss.index_factory(vectors.shape[1], FACTORIES[kind], faiss.METRIC_INNER_PRODUCT)
+        index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+        return cls(kind, index, generation, directory)
+
+    @property
+    def size(self):
+        return self.index.ntotal
+
+    @property
+    def dim(self):
+        return self.index.d
+
+    @property
+    def nbytes(self):
+        """Bytes of codes; codebooks and lookup tables are a few hundred KB on top."""
+        return self.index.sa_code_size() * self.size
+
+    def add(self, vectors):
+        self.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+
+    def shortlist(self, query, candidates):
+        """Rows of the `candidates` best quantized scores."""
+        _, rows = self.index.search(query.reshape(1, -1), min(candidates, self.size))
+        return rows[0][rows[0] >= 0]
+
+    def path(self):
+        return os.path.join(self.directory, CODES_FILE.format(generation=self.generation, kind=self.kind))
+
+    def save(self):
+        import faiss
+
+        path = self.path()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        faiss.write_index(self.index, tmp)
+        os.replace(tmp, path)
+        # Codes for earlier generations, or the other codec, are dead weight
+        for name in os.listdir(self.directory):
+            if name.startswith("codes-") and name.endswith(".faiss") and name != os.path.basename(path):
+                os.remove(os.path.join(self.directory, name))
+
+    @classmethod
+    def load(cls, kind, generation, directory):
+        import faiss
+
+        path = os.path.join(directory, CODES_FILE.format(generation=generation, kind=kind))
+        if not os.path.exists(path):
+            return None
+        return cls(kind, faiss.read_index(path), generation, directory)
+
+
+def rerank_search(codes, store, query, top_k=3, candidates=RERANK_CANDIDATES):
+    """Shortlists by quantized score, then re-scores the shortlist from the full-precision rows."""
+    query = normalize(query)
+    shortlist = np.sort(codes.shortlist(query, max(candidates, top_k)))  # Sorted: sequential page-ins
+    exact = store.matrix[shortlist].astype(np.float32) @ query
+    return [(int(shortlist[i]), float(exact[i])) for i in top_k_rows(exact, top_k)]
+
+
+def sync_codes(codes, store, batch_size=SYNC_BATCH_SIZE):
+    """Encodes store rows the codes have not seen yet; returns True if anything changed."""
+    if codes.size == store.count:
+        return False
+    for start in range(codes.size, store.count, batch_size):
+        codes.add(store.matrix[start:start + batch_size])
+    return True
+
+
+def build_codes(kind, store):
+    """Trains a codebook on the first TRAIN_ROWS store rows; rows are added by `sync_codes`."""
+    return QuantizedCodes.train(kind, store.matrix[:TRAIN_ROWS], store.generation, store.directory)
+
+
+_codes = None
+_codes_lock = threading.Lock()
+
+
+def get_codes(store, kind=EMBEDDING_QUANTIZATION):
+    """Loads the codes for the store once per process and keeps them level with it.
+
+    Returns None when quantization is off or the store is too small for it.
+    """
+    global _codes
+    if kind not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {kind!r}, expected one of {QUANTIZATIONS}")
+    if kind == "none" or store.count < MIN_ROWS[kind]:
+        return None
+    with _codes_lock:
+        current = (kind, store.directory, store.generation)
+        if _codes is None or (_codes.kind, _codes.directory, _codes.generation) != current:
+            _codes = QuantizedCodes.load(kind, store.generation, store.directory)
+        if _codes is None or _codes.size > store.count or _codes.dim != store.dim:
+            print(f"🔄 Building {kind} codes from the embedding store...")
+            _codes = build_codes(kind, store)
+        if sync_codes(_codes, store):
+            _codes.save()
+        return _codes
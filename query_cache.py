@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cachetools import TTLCache
+
+# ======================
+# 🔁 Query Cache
+# ======================
+# The app sends the same templated queries on every rerun and "Ask" click.
+# Query embeddings and top-k results are kept in a bounded in-process LRU
+# with a TTL, optionally backed by a SQLite file that every worker process
+# on the box shares. Results are keyed on the index version, so a rebuilt or
+# grown store never serves stale hits; embeddings depend only on the model.
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 3600))
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH")  # e.g. vectorstore/query_cache.sqlite; unset = memory only
+DISK_CACHE_MAX_ROWS = int(os.getenv("QUERY_CACHE_DISK_ROWS", 50_000))
+
+
+def normalize_query(query):
+    # all-MiniLM-L6-v2 is uncased and splits on whitespace, so case and
+    # spacing never change the embedding
+    return " ".join(query.split()).lower()
+
+
+class DiskCache:
+    """SQLite tier shared across processes. Values are JSON."""
+
+    def __init__(self, path, ttl=QUERY_CACHE_TTL, max_rows=DISK_CACHE_MAX_ROWS):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(namespace TEXT, key TEXT, value TEXT, created REAL, PRIMARY KEY (namespace, key))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS cache_created ON cache (created)")
+
+    def connection(self):
+        # sqlite connections can't be shared between threads
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+            self.local.db = db
+        return db
+
+    def get(self, namespace, key):
+        row = self.connection().execute(
+            "SELECT value, created FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value):
+        with self.connection() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time())
+            )
+            db.execute("DELETE FROM cache WHERE created < ?", (time.time() - self.ttl,))
+            db.execute(
+                "DELETE FROM cache WHERE rowid IN "
+                "(SELECT rowid FROM cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            )
+
+
+class QueryCache:
+    """Two-tier cache: in-process LRU+TTL in front of an optional DiskCache."""
+
+    def __init__(self, namespace, maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL, disk=None):
+        self.namespace = namespace
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk = disk
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get(self, key):
+        with self.lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.stats["hits"] += 1
+                return value
+        value = self.disk.get(self.namespace, key) if self.disk else None
+        with self.lock:
+            if value is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["disk_hits"] += 1
+                self.memory[key] = value
+        return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.memory[key] = value
+        if self.disk:
+            self.disk.set(self.namespace, key, value)
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+
+_disk = DiskCache(QUERY_CACHE_PATH) if QUERY_CACHE_PATH else None
+embedding_cache = QueryCache("embedding", disk=_disk)
+result_cache = QueryCache("topk", disk=_disk)
+
+
+def cache_stats():
+    """Hit/miss counters for both caches, e.g. for a debug panel."""
+    return {"embedding": dict(embedding_cache.stats), "topk": dict(result_cache.stats)}
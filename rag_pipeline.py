@@ -1,14 +1,38 @@
-from langchain_groq import ChatGroq
+import functools
+import os
+import time
 # from vector_database import faiss_db
-from langchain_core.prompts import ChatPromptTemplate
-import numpy as np
-from vector_database import collection, embeddings
+from vector_database import EMBEDDING_MODEL_NAME, get_collection, get_embedding_model
+from embedding_store import get_store
+from vector_store import get_vector_store
+from lexical_index import hybrid_search
+from query_cache import embedding_cache, normalize_query, result_cache
+from context_budget import assemble_context, count_tokens
+from response_cache import ResponseCache, model_name
+from tracing import record, span, traced
 # Uncomment the following if you're NOT using pipenv
 from dotenv import load_dotenv
 load_dotenv()
 
 #Step1: Setup LLM (Use DeepSeek R1 with Groq)
-llm_model=ChatGroq(model="deepseek-r1-distill-llama-70b")
+LLM_MODEL_NAME = "deepseek-r1-distill-llama-70b"
+
+@functools.lru_cache(maxsize=None)
+def get_llm_model(model_name=LLM_MODEL_NAME):
+    from langchain_groq import ChatGroq
+    return ChatGroq(model=model_name)
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # "hybrid" (BM25 + dense) or "dense"
+
+def get_retriever():
+    """The process-wide vector store (VECTOR_BACKEND) that queries are answered from."""
+    return get_vector_store()
+
+def __getattr__(name):
+    # `from rag_pipeline import llm_model` keeps working, lazily
+    if name == "llm_model":
+        return get_llm_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 #Step2: Retrieve Docs
 
@@ -18,33 +42,62 @@ llm_model=ChatGroq(model="deepseek-r1-distill-llama-70b")
 # def get_context(documents):
 #     context = "\n\n".join([doc.page_content for doc in documents])
 #     return context
+def embed_query(query):
+    """Query embedding, computed once per normalized query text."""
+    query = normalize_query(query)
+    key = f"{EMBEDDING_MODEL_NAME}\0{query}"
+    query_embedding = embedding_cache.get(key)
+    if query_embedding is None:
+        with span("retrieval.embed"):
+            query_embedding = get_embedding_model().embed_query(query)
+        embedding_cache.set(key, query_embedding)
+    return query_embedding
+
+def chunk_metadata(chunk_ids):
+    """Source, page and start_index of each chunk, in one round trip to Mongo."""
+    fields = {"source": 1, "page": 1, "start_index": 1}
+    return {
+        str(doc.pop("_id")): doc
+        for doc in get_collection().find({"_id": {"$in": list(chunk_ids)}}, fields)
+    }
+
+@traced("retrieval")
 def retrieve_docs(query, top_k=3):
-    query_embedding = embeddings.embed_query(query)
-
-    # Fetch all documents from MongoDB
-    results = collection.find({})
-    scored_results = []
-    
-    for doc in results:
-        stored_embedding = np.array(doc["embedding"])
-        score = np.dot(query_embedding, stored_embedding)  # Cosine similarity
-
-        scored_results.append((doc["text"], score))
-
-    # Sort results by similarity score (highest first)
-    scored_results.sort(key=lambda x: x[1], reverse=True)
-
-    retrieved_texts = [text for text, _ in scored_results[:top_k]]
-
-    if not retrieved_texts:
+    from langchain_core.documents import Document
+
+    store = get_retriever()
+
+    # Repeat queries against the same index version skip embedding and search
+    key = f"{RETRIEVAL_MODE}:{store.version}:{top_k}\0{normalize_query(query)}"
+    retrieved = result_cache.get(key)
+    if retrieved is None:
+        query_embedding = embed_query(query)
+        with span("retrieval.search"):
+            if RETRIEVAL_MODE == "hybrid":
+                # Exact terms like "APR" or "snowball" come from the BM25 side
+                hits = hybrid_search(store, get_store(get_collection()), query, query_embedding, top_k)
+            else:
+                hits = store.search(query_embedding, top_k)
+
+        # Hits come back highest similarity first; where each chunk sits in
+        # its page lets the context budget merge overlapping neighbours
+        with span("retrieval.metadata"):
+            metadata = chunk_metadata(chunk_id for chunk_id, _, _ in hits) if hits else {}
+        retrieved = [
+            [text, {**metadata.get(chunk_id, {}), "chunk_id": chunk_id, "score": score}]
+            for chunk_id, score, text in hits
+        ]
+        result_cache.set(key, retrieved)
+
+    if not retrieved:
         print("⚠️ No relevant documents found in MongoDB.")
 
-    return retrieved_texts
+    return [Document(page_content=text, metadata=metadata) for text, metadata in retrieved]
 
+@traced("context.assemble")
 def get_context(documents):
-    # Since ⁠ retrieve_docs() ⁠ returns a list of strings, no need for ⁠ .page_content ⁠
-    context = "\n\n".join(documents)  # Joining text chunks as context
-    return context
+    # Overlapping and duplicate chunks are folded, then packed into the token budget
+    return assemble_context(documents)
 
 
 #Step3: Answer Question
@@ -56,26 +109,118 @@ Analyze the income and debt data provided by the user and suggest the best way t
 Calculate the amount saved by providing the best strategy to payoff the debt. Answer the question in a detailed manner. Do not use the $ symbol while generating the response.
 Question: {question} 
 Context: {context} 
-Income: 4000 dollars per month
-Essential Expenses: 2000 dollars per month
-Non-Essential Expenses: 1000 dollars per month
-Debt 1: 10000 dollars(Credit Card)
-Debt 2: 5000 dollars(Student Loan)
-Debt 3: 3000 dollars(Car Loan)
-APR1: 18%
-APR2: 6%
-APR3: 5%
-Duration1: 12 months
-Duration2: 10 years
-Duration3: 5 years
 Answer:
 """
 
-def answer_query(documents, model, query):
+@functools.lru_cache(maxsize=None)
+def get_prompt():
+    from langchain_core.prompts import ChatPromptTemplate
+    return ChatPromptTemplate.from_template(custom_prompt_template)
+
+@traced("prompt.render")
+def render_prompt(query, context):
+    """The prompt as sent to the LLM; its token count is logged per call."""
+    rendered = get_prompt().format(question=query, context=context)
+    print(f"🧮 Prompt: {count_tokens(rendered)} tokens")
+    return rendered
+
+@functools.lru_cache(maxsize=None)
+def get_response_cache():
+    return ResponseCache(embed=embed_query)
+
+def answer_query(documents, model, query, use_cache=True):
+    from langchain_core.messages import AIMessage
+
     context = get_context(documents)
-    prompt = ChatPromptTemplate.from_template(custom_prompt_template)
+    prompt = get_prompt()
+    cache = get_response_cache() if use_cache else None
+
+    rendered = render_prompt(query, context)
+    # The same portfolio renders the same prompt: answer it from the cache
+    if cache is not None:
+        cached = cache.get(model_name(model), rendered, documents, question=query)
+        if cached is not None:
+            return AIMessage(content=cached, response_metadata={"cached": True})
+
+    chain = prompt | model
+    started = time.perf_counter()
+    with span("llm.invoke"):
+        response = chain.invoke({"question": query, "context": context})
+    if cache is not None:
+        cache.set(model_name(model), rendered, documents, response.content,
+                  time.perf_counter() - started, question=query)
+    return response
+
+
+#Step4: Stream Answer
+# DeepSeek R1 reasons inside <think>...</think> before answering. Tokens are
+# split into ("think", text) and ("answer", text) pieces as they arrive, so
+# the UI can show something on the first token instead of the last.
+
+class ThinkParser:
+    """Incremental splitter for <think> blocks; tags may straddle token boundaries."""
+
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self.thinking = False
+        self.pending = ""
+
+    def feed(self, text):
+        pieces = []
+        self.pending += text
+        while self.pending:
+            tag = self.CLOSE if self.thinking else self.OPEN
+            at = self.pending.find(tag)
+            if at >= 0:
+                pieces.append((self.kind, self.pending[:at]))
+                self.pending = self.pending[at + len(tag):]
+                self.thinking = not self.thinking
+                continue
+            # Hold back a tail that could be the start of the tag
+            keep = next((n for n in range(len(tag) - 1, 0, -1) if self.pending.endswith(tag[:n])), 0)
+            pieces.append((self.kind, self.pending[:len(self.pending) - keep]))
+            self.pending = self.pending[len(self.pending) - keep:]
+            break
+        return [(kind, text) for kind, text in pieces if text]
+
+    def finish(self):
+        pieces = [(self.kind, self.pending)] if self.pending else []
+        self.pending = ""
+        return pieces
+
+    @property
+    def kind(self):
+        return "think" if self.thinking else "answer"
+
+def stream_answer_query(documents, model, query, use_cache=True):
+    """Like `answer_query`, but yields ("think" | "answer", text) pieces as tokens arrive."""
+    context = get_context(documents)
+    prompt = get_prompt()
+    cache = get_response_cache() if use_cache else None
+    parser = ThinkParser()
+
+    rendered = render_prompt(query, context)
+    if cache is not None:
+        cached = cache.get(model_name(model), rendered, documents, question=query)
+        if cached is not None:
+            yield from parser.feed(cached)
+            yield from parser.finish()
+            return
+
     chain = prompt | model
-    return chain.invoke({"question": query, "context": context})
+    started = time.perf_counter()
+    content = []
+    for chunk in chain.stream({"question": query, "context": context}):
+        if not content:
+            record("llm.first_token", (time.perf_counter() - started) * 1000)
+        content.append(chunk.content)
+        yield from parser.feed(chunk.content)
+    yield from parser.finish()
+    record("llm.stream", (time.perf_counter() - started) * 1000)  # To the last token, as the caller consumed it
+    if cache is not None:
+        cache.set(model_name(model), rendered, documents, "".join(content),
+                  time.perf_counter() - started, question=query)
 
 #question="If a government forbids the right to assemble peacefully which articles are violated and why?"
 #retrieved_docs=retrieve_docs(question)
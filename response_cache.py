@@ -0,0 +1,128 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# ======================
+# 💾 LLM Response Cache
+# ======================
+# Identical portfolios render identical prompts, so their answers are kept in
+# SQLite keyed on a fingerprint of the model, the rendered prompt and the
+# retrieved chunks. Optionally, a near-duplicate question over the same
+# chunks can reuse an answer when the question embeddings are close enough.
+# That is off by default: two portfolios that differ only in a balance embed
+# almost identically but deserve different advice.
+
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "vectorstore/response_cache.sqlite")
+RESPONSE_CACHE_MAX_ROWS = int(os.getenv("RESPONSE_CACHE_MAX_ROWS", 5_000))
+RESPONSE_CACHE_SIMILARITY = os.getenv("RESPONSE_CACHE_SIMILARITY")  # e.g. 0.98; unset = exact only
+
+
+def model_name(model):
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+
+def chunks_fingerprint(documents):
+    digest = hashlib.sha256()
+    for document in documents:
+        text = getattr(document, "page_content", document)  # Documents or plain strings
+        digest.update(hashlib.sha256(text.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+def prompt_fingerprint(model, prompt, chunks):
+    return hashlib.sha256(f"{model}\0{chunks}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded SQLite cache of LLM answers, least recently used rows evicted first."""
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_rows=RESPONSE_CACHE_MAX_ROWS,
+                 similarity=RESPONSE_CACHE_SIMILARITY, embed=None):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_rows = max_rows
+        self.similarity = float(similarity) if similarity else None
+        self.embed = embed  # query -> vector; only needed for near-duplicate lookups
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, chunks TEXT, question BLOB, "
+                "content TEXT, latency REAL, last_used REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_chunks ON responses (model, chunks)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "seconds_saved": 0.0}
+
+    def _touch(self, key):
+        with self.db:
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+
+    def _nearest(self, model, chunks, question):
+        """Closest cached question over the same chunks, if it clears the threshold."""
+        rows = self.db.execute(
+            "SELECT key, question, content, latency FROM responses "
+            "WHERE model = ? AND chunks = ? AND question IS NOT NULL", (model, chunks)
+        ).fetchall()
+        if not rows:
+            return None
+        matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), -1)
+        scores = matrix @ question
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        return rows[best][0], rows[best][2], rows[best][3]
+
+    def get(self, model, prompt, documents, question=None):
+        """Cached answer text, or None. `question` enables the near-duplicate lookup."""
+        chunks = chunks_fingerprint(documents)
+        key = prompt_fingerprint(model, prompt, chunks)
+        with self.lock:
+            row = self.db.execute("SELECT content, latency FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._touch(key)
+                self.stats["hits"] += 1
+                self.stats["seconds_saved"] += row[1]
+                return row[0]
+            if self.similarity and self.embed and question is not None:
+                match = self._nearest(model, chunks, self.question_vector(question))
+                if match is not None:
+                    self._touch(match[0])
+                    self.stats["semantic_hits"] += 1
+                    self.stats["seconds_saved"] += match[2]
+                    return match[1]
+            self.stats["misses"] += 1
+            return None
+
+    def question_vector(self, question):
+        vector = np.asarray(self.embed(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def set(self, model, prompt, documents, content, latency, question=None):
+        chunks = chunks_fingerprint(documents)
+        key = prompt_fingerprint(model, prompt, chunks)
+        vector = None
+        if self.similarity and self.embed and question is not None:
+            vector = self.question_vector(question).tobytes()
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, chunks, vector, content, latency, time.time())
+            )
+            self.db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            )
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        return (self.stats["hits"] + self.stats["semantic_hits"]) / lookups if lookups else 0.0
+
+    def report(self):
+        return {**self.stats, "hit_rate": self.hit_rate()}
@@ -0,0 +1,198 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+
+from payoff_engine import MAX_SIMULATED_MONTHS, PAID_TOLERANCE, _prepare, strategy_order
+from tracing import traced
+
+# ======================
+# 🎲 Monte Carlo Stress Simulator
+# ======================
+# The payoff engine assumes today's APRs and income hold forever. Here a
+# portfolio is replayed along many randomized paths at once, as a
+# (paths x debts) balance array stepped month by month with the engine's
+# payment arithmetic:
+#
+#   - variable-rate debts (flagged `variable`, or by default anything at or
+#     above VARIABLE_APR_FLOOR, i.e. credit cards) follow one rate shift per
+#     path, a random walk with drift, capped at APR_CEILING
+#   - each path loses its income with a small monthly probability and gets it
+#     back with another; a month without income pays nothing and the
+#     interest is added to the balance
+#
+# Shock sizes scale with the stress level. Finished paths and debts cleared
+# on every path are dropped from the arrays, so a month costs
+# O(open paths x open debts). Large runs are split over a process pool with
+# independent random streams. The app asks for INTERACTIVE_PATHS, few enough
+# to stay in-process on a click; batch runs and benchmarks get the full
+# SIMULATION_PATHS.
+
+SIMULATION_PATHS = int(os.getenv("SIMULATION_PATHS", 10_000))
+INTERACTIVE_PATHS = int(os.getenv("INTERACTIVE_PATHS", 2_000))  # Below PATHS_PER_WORKER: no pool
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", os.cpu_count() or 1))
+PATHS_PER_WORKER = 5_000  # Smaller shares don't pay for shipping work to another process
+PERCENTILES = (50, 90, 99)
+VARIABLE_APR_FLOOR = 15.0  # Unflagged debts at or above this APR are treated as variable-rate cards
+APR_CEILING = 36.0  # Variable APRs never rise above this (or their starting APR, if higher)
+
+# rate_drift / rate_volatility: mean and spread of the monthly change in
+# variable APRs (percentage points); income_loss / recovery: monthly odds of
+# losing and of regaining the income that makes payments
+STRESS_SHOCKS = {
+    "Calm": {"rate_drift": 0.01, "rate_volatility": 0.10, "income_loss": 0.005, "recovery": 0.5},
+    "Tense": {"rate_drift": 0.02, "rate_volatility": 0.20, "income_loss": 0.01, "recovery": 0.35},
+    "Panic": {"rate_drift": 0.04, "rate_volatility": 0.35, "income_loss": 0.02, "recovery": 0.25},
+}
+
+
+def _simulate_paths(balance, apr, min_emi, variable, extra, shocks, paths, seed, max_months):
+    """Runs `paths` randomized paths; returns (months, total interest, converged) per path.
+
+    Balances are a (debts x paths) array with debts in attack order, so every
+    per-path reduction runs along contiguous rows and the extra budget is
+    poured down the rows until it runs out, as in `_pay_extra`. Balances
+    never go negative and a cleared debt is exactly zero, so interest needs
+    no open-debt mask and a debt cleared on every open path is dropped.
+    """
+    if max(balance, default=0.0) <= PAID_TOLERANCE:
+        return np.zeros(paths, dtype=np.int64), np.zeros(paths), np.ones(paths, dtype=bool)
+    rng = np.random.default_rng(seed)
+    base_rate = np.asarray(apr, dtype=np.float64)[:, None] / 1200
+    ceiling = np.maximum(base_rate, APR_CEILING / 1200)
+    variable = np.asarray(variable, dtype=bool)
+    min_emi = np.asarray(min_emi, dtype=np.float64)[:, None]
+
+    b = np.repeat(np.asarray(balance, dtype=np.float64)[:, None], paths, axis=1)
+    shift = np.zeros(paths)  # Change in variable monthly rates so far, per path
+    out_of_work = np.zeros(paths, dtype=bool)
+    interest_total = np.zeros(paths)
+    months = np.full(paths, max_months, dtype=np.int64)
+    converged = np.zeros(paths, dtype=bool)
+    spent = np.zeros(paths)  # Interest of the open paths, kept aligned with `b`
+    interest = None
+
+    rows = np.arange(paths)
+    month = 0
+    while rows.size and month < max_months:
+        month += 1
+        if interest is None or interest.shape != b.shape:
+            # Scratch arrays, reused while the shape holds so big runs don't churn the allocator
+            interest, owed, short = np.empty_like(b), np.empty_like(b), np.empty(b.shape, dtype=bool)
+
+        # Step 1: This month's shocks
+        shift += (shocks["rate_drift"] + shocks["rate_volatility"] * rng.standard_normal(rows.size)) / 1200
+        draws = rng.random(rows.size)
+        out_of_work = np.where(out_of_work, draws >= shocks["recovery"], draws < shocks["income_loss"])
+
+        # Step 2: Minimum payments, with the engine's arithmetic; nothing is paid without income
+        np.multiply(b, base_rate, out=interest)
+        if variable.any():
+            rates = np.minimum(np.maximum(base_rate[variable] + shift, 0.0), ceiling[variable])
+            interest[variable] = b[variable] * rates
+        np.add(b, interest, out=owed)
+        payment = np.minimum(min_emi, owed, out=b)  # The balance is rebuilt from `owed` below
+        np.less(min_emi, interest, out=short)
+        if short.any():
+            # Ensure payment covers at least interest
+            payment[short] = np.minimum(interest[short] + 0.01, owed[short])
+        if out_of_work.any():
+            payment[:, out_of_work] = 0.0
+        b = np.subtract(owed, payment, out=payment)
+        spent += interest.sum(axis=0)
+
+        # Step 3: Pour the extra budget down the attack order until it runs out
+        budget = np.where(out_of_work, 0.0, extra)
+        for debt in b:
+            if not budget.any():
+                break
+            pay = np.minimum(budget, np.where(debt > PAID_TOLERANCE, debt, 0.0))
+            debt -= pay
+            budget -= pay
+
+        # Step 4: Retire finished paths and debts cleared on every open path
+        finished = b.max(axis=0, initial=0.0) <= PAID_TOLERANCE
+        if finished.any():
+            done = rows[finished]
+            months[done], interest_total[done], converged[done] = month, spent[finished], True
+            keep = ~finished
+            rows, b, shift, out_of_work, spent = rows[keep], b[:, keep], shift[keep], out_of_work[keep], spent[keep]
+        cleared = b.max(axis=1, initial=0.0) == 0
+        if cleared.any():
+            keep = ~cleared
+            b, base_rate, ceiling = b[keep], base_rate[keep], ceiling[keep]
+            variable, min_emi = variable[keep], min_emi[keep]
+
+    interest_total[rows] = spent
+    return months, interest_total, converged
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """A process pool of `workers`, started once per process and reused across runs."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.terminate()
+            # Spawn rather than fork: the parent may already hold the embedding model's threads
+            _pool = multiprocessing.get_context("spawn").Pool(workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _percentiles(values):
+    # Actual path outcomes rather than interpolations, so "never" (inf) stays representable
+    return {f"p{q}": float(np.percentile(values, q, method="inverted_cdf")) for q in PERCENTILES}
+
+
+@traced("payoff.stress")
+def simulate_stress(debts, strategy, available_emi, stress_level, paths=SIMULATION_PATHS,
+                    workers=SIMULATION_WORKERS, seed=None, shocks=None, order=None,
+                    max_months=MAX_SIMULATED_MONTHS):
+    """Payoff-month and total-interest distributions over `paths` randomized rate/income paths.
+
+    `shocks` overrides the stress level's entry in STRESS_SHOCKS and `order`
+    the strategy's attack order. Months are inf for paths still owing after
+    `max_months`; their interest is counted up to that point.
+    """
+    started = time.perf_counter()
+    debts = _prepare(debts)
+    shocks = shocks or STRESS_SHOCKS[stress_level]
+    if order is None:
+        order = strategy_order(debts, strategy, stress_level)
+    ranked = [debts[i] for i in order]
+    extra = max(available_emi - sum(d['min_emi'] for d in debts), 0)
+    args = (
+        [d['balance'] for d in ranked],
+        [float(d['apr']) for d in ranked],
+        [float(d['min_emi']) for d in ranked],
+        [d.get('variable', d['apr'] >= VARIABLE_APR_FLOOR) for d in ranked],
+        extra, shocks
+    )
+
+    # Independent random streams per worker, reproducible for a given seed and worker count
+    workers = max(1, min(workers, paths // PATHS_PER_WORKER))
+    streams = np.random.SeedSequence(seed).spawn(workers)
+    sizes = [paths // workers + (w < paths % workers) for w in range(workers)]
+    tasks = [(*args, size, stream, max_months) for size, stream in zip(sizes, streams)]
+    if workers == 1:
+        parts = [_simulate_paths(*tasks[0])]
+    else:
+        parts = get_pool(workers).starmap(_simulate_paths, tasks)
+
+    months, interest, converged = (np.concatenate(column) for column in zip(*parts))
+    months = np.where(converged, months, np.inf)
+    return {
+        'paths': paths,
+        'months': _percentiles(months),
+        'total_interest': _percentiles(interest),
+        'never_paid_off': float(1 - converged.mean()),
+        'seconds': time.perf_counter() - started
+    }
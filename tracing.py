@@ -0,0 +1,189 @@
+import bisect
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# ======================
+# ⏱️ Stage Tracing
+# ======================
+# Latency spans around each stage of the RAG and payoff paths:
+# `with span("retrieval.search"):` or `@traced("payoff.solve")` records the
+# wall time of the block into that stage's histogram (fixed latency buckets,
+# plus a window of recent samples for percentiles). A span costs two clock
+# reads and a dict update, so tracing stays on; TRACE_ENABLED=0 skips it.
+# Stages are process-wide, shared by every session of the app.
+#
+# TRACE_PROFILE lists stages to profile as well (comma-separated, "*" for
+# all), with cProfile or, when TRACE_PROFILER=pyinstrument and it is
+# installed, pyinstrument. Profiles accumulate per stage until
+# `write_profiles` saves them to TRACE_PROFILE_DIR. `export_json` is the
+# snapshot behind the app's debug panel and the pipeline benchmark.
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") != "0"
+TRACE_PROFILE = frozenset(stage.strip() for stage in os.getenv("TRACE_PROFILE", "").split(",") if stage.strip())
+TRACE_PROFILER = os.getenv("TRACE_PROFILER", "cprofile")  # "cprofile" or "pyinstrument"
+TRACE_PROFILE_DIR = os.getenv("TRACE_PROFILE_DIR", "profiles")
+TRACE_WINDOW = 1024  # Recent samples per stage that percentiles are taken over
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class StageStats:
+    """Latency histogram of one stage, in milliseconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # The last one is everything above BUCKETS_MS[-1]
+        self.recent = deque(maxlen=TRACE_WINDOW)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.recent.append(ms)
+
+    def snapshot(self):
+        recent = sorted(self.recent)
+
+        def percentile(q):
+            return recent[min(int(q / 100 * len(recent)), len(recent) - 1)] if recent else 0.0
+
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": self.total,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": self.max,
+            "histogram": {label: n for label, n in zip(labels, self.buckets) if n}
+        }
+
+
+_stages = {}
+_profiles = {}  # stage -> pstats.Stats or pyinstrument Session, accumulated
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def record(stage, ms):
+    """Adds one `ms` sample to `stage`, for timings a span can't wrap (e.g. time to first token)."""
+    if not TRACE_ENABLED:
+        return
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = StageStats()
+        stats.add(ms)
+
+
+def _start_profile(stage):
+    if not TRACE_PROFILE or (stage not in TRACE_PROFILE and "*" not in TRACE_PROFILE):
+        return None
+    if getattr(_local, "profiling", False):
+        return None  # One profiler per thread: the enclosing stage's profile already covers this one
+    _local.profiling = True
+    if TRACE_PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        except ImportError:
+            print("⚠️ pyinstrument is not installed, profiling with cProfile.")
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profile(stage, profiler):
+    _local.profiling = False
+    if hasattr(profiler, "last_session"):
+        from pyinstrument.session import Session
+        profiler.stop()
+        with _lock:
+            previous = _profiles.get(stage)
+            _profiles[stage] = profiler.last_session if previous is None else Session.combine(
+                previous, profiler.last_session
+            )
+        return
+
+    import pstats
+    profiler.disable()
+    with _lock:
+        if stage in _profiles:
+            _profiles[stage].add(profiler)
+        else:
+            _profiles[stage] = pstats.Stats(profiler)
+
+
+@contextlib.contextmanager
+def span(stage):
+    """Times the enclosed block into `stage`, profiling it too if TRACE_PROFILE asks for it."""
+    if not TRACE_ENABLED:
+        yield
+        return
+    profiler = _start_profile(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        if profiler is not None:
+            _stop_profile(stage, profiler)
+        record(stage, elapsed)
+
+
+def traced(stage):
+    """Decorator form of `span`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def export_json(path=None):
+    """Every stage's counters and histogram, slowest total first; also written to `path` if given."""
+    with _lock:
+        stages = {stage: stats.snapshot() for stage, stats in _stages.items()}
+    snapshot = {"stages": dict(sorted(stages.items(), key=lambda item: -item[1]["total_ms"]))}
+    if path:
+        with open(path, "w") as f:
+            json.dump(snapshot, f, indent=1)
+    return snapshot
+
+
+def write_profiles(directory=TRACE_PROFILE_DIR):
+    """Saves the accumulated profiles, `<stage>.prof` (pstats) or `<stage>.html`; returns the paths."""
+    os.makedirs(directory, exist_ok=True)
+    with _lock:
+        profiles = dict(_profiles)
+    paths = []
+    for stage, profile in profiles.items():
+        if hasattr(profile, "dump_stats"):
+            path = os.path.join(directory, f"{stage}.prof")
+            profile.dump_stats(path)
+        else:
+            from pyinstrument.renderers import HTMLRenderer
+            path = os.path.join(directory, f"{stage}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(HTMLRenderer().render(profile))
+        paths.append(path)
+    return paths
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _profiles.clear()
@@ -1,38 +1,26 @@
+import functools
+import hashlib
+import json
 import os
-from langchain_community.document_loaders import PDFPlumberLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-# from langchain_ollama import OllamaEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+import time
 
 from dotenv import load_dotenv
 load_dotenv()
-# Step 1: Load raw PDFs from the directory
-pdfs_directory = 'pdfs/'
 
-def load_pdfs_from_directory(directory):
-    documents = []
-    for filename in os.listdir(directory):
-        if filename.endswith(".pdf"):
-            file_path = os.path.join(directory, filename)
-            loader = PDFPlumberLoader(file_path)
-            documents.extend(loader.load())
-    return documents
+from embedding_store import STORE_DIR, EmbeddingStore, EmbeddingStoreWriter, rebuild_from_collection
+from lexical_index import get_lexical_index
+from tracing import span
 
-documents = load_pdfs_from_directory(pdfs_directory)
-# print("PDF pages: ", len(documents))
+# Nothing heavy happens at import time. The embedding model and the Mongo
+# connection pool are created on first use and cached for the process;
+# ingestion runs only from `python vector_database.py`.
 
-# Step 2: Create Chunks
-def create_chunks(documents): 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        add_start_index=True
-    )
-    text_chunks = text_splitter.split_documents(documents)
-    return text_chunks
+# Step 1: Load raw PDFs from the directory
+pdfs_directory = 'pdfs/'
 
-text_chunks = create_chunks(documents)
+# Step 2: Create Chunks
+# Loading and chunking live in pdf_loader so pool workers don't import the
+# embedding model; see `iter_chunked_pages` for the streaming path.
 
 # model_name="sentence-transformers/all-MiniLM-L6-v2"
 # def get_embedding_model(model_name=model_name):
@@ -44,50 +32,262 @@ text_chunks = create_chunks(documents)
 # faiss_db = FAISS.from_documents(text_chunks, get_embedding_model(model_name))
 # faiss_db.save_local(FAISS_DB_PATH)
 
-from pymongo import MongoClient
-from pymongo.errors import BulkWriteError
-from bson import ObjectId
-
-MONGO_URI = YOUR_URI
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_POOL_SIZE = int(os.getenv("MONGO_POOL_SIZE", 20))
 DATABASE_NAME = "vector_db"
 COLLECTION_NAME = "embeddings"
+GENERATIONS_COLLECTION_NAME = "generations"
+
+@functools.lru_cache(maxsize=None)
+def get_client():
+    """One pooled MongoClient per process."""
+    from pymongo import MongoClient
+    return MongoClient(MONGO_URI, maxPoolSize=MONGO_POOL_SIZE)
 
-client = MongoClient(MONGO_URI)
-db = client[DATABASE_NAME]
-collection = db[COLLECTION_NAME]
+def get_collection():
+    return get_client()[DATABASE_NAME][COLLECTION_NAME]
 
-from langchain.embeddings import HuggingFaceEmbeddings
+def collection_generation(collection):
+    """Counter bumped whenever chunks are written to or removed from `collection`; keys result caches."""
+    doc = collection.database[GENERATIONS_COLLECTION_NAME].find_one({"_id": collection.name})
+    return doc["generation"] if doc else 0
+
+def bump_generation(collection):
+    collection.database[GENERATIONS_COLLECTION_NAME].update_one(
+        {"_id": collection.name}, {"$inc": {"generation": 1}}, upsert=True
+    )
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
 
 # Load the embedding model
-def get_embedding_model(model_name="sentence-transformers/all-MiniLM-L6-v2"):
-    return HuggingFaceEmbeddings(model_name=model_name)
+@functools.lru_cache(maxsize=None)
+def get_embedding_model(model_name=EMBEDDING_MODEL_NAME, batch_size=EMBED_BATCH_SIZE):
+    from langchain.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"batch_size": batch_size})
+
+def __getattr__(name):
+    # `from vector_database import collection, embeddings` keeps working, lazily
+    if name == "collection":
+        return get_collection()
+    if name == "embeddings":
+        return get_embedding_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-embeddings = get_embedding_model()
+# Step 3: Incremental ingestion
+# Files and chunks are content-hashed. A manifest remembers which chunk ids
+# each PDF produced, so a run only parses new or changed files, only embeds
+# chunks it has never seen and deletes the chunks of files that are gone.
+MANIFEST_PATH = os.path.join(STORE_DIR, "manifest.json")
 
-def store_in_mongo(text_chunks):
-    documents = []
-    existing_ids = {doc["_id"] for doc in collection.find({}, {"_id": 1})}  # Get existing IDs
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-    for i, chunk in enumerate(text_chunks):
-        embedding = embeddings.embed_query(chunk.page_content)  # Generate vector
-        new_id = ObjectId()  # Generate a unique ObjectId
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-        # Ensure the generated _id is not a duplicate (if using sequential numbers)
-        while new_id in existing_ids:
-            new_id = ObjectId()
+def chunk_id(source, text):
+    # 24 hex characters, the same width as the ObjectIds it replaces
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:24]
 
-        document = {
-            "_id": new_id,  # Unique ID
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {"embedding_model": EMBEDDING_MODEL_NAME, "files": {}}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, MANIFEST_PATH)
+
+def chunk_documents(text_chunks):
+    """Mongo documents (without embeddings) for chunks, de-duplicated by id."""
+    documents = {}
+    for chunk in text_chunks:
+        source = chunk.metadata.get("source", "")
+        doc_id = chunk_id(source, chunk.page_content)
+        documents[doc_id] = {
+            "_id": doc_id,  # Same chunk, same id: re-runs never pile up duplicates
             "text": chunk.page_content,
-            "embedding": embedding
+            "text_hash": text_hash(chunk.page_content),
+            "source": source,
+            "page": chunk.metadata.get("page"),
+            "start_index": chunk.metadata.get("start_index"),
         }
-        documents.append(document)
-
-    try:
-        collection.insert_many(documents, ordered=False)  # Insert all at once, continue on error
-        print("✅ Embeddings stored in MongoDB successfully.")
-    except BulkWriteError as e:
-        print("⚠️ Bulk write error:", e.details)  # Print error details
-        
-# Store chunks in MongoDB
-store_in_mongo(text_chunks)
+    return list(documents.values())
+
+def store_in_mongo(text_chunks, writer=None, batch_size=EMBED_BATCH_SIZE, stats=None):
+    """Embeds and upserts chunks one batch at a time, mirroring each batch into `writer`.
+
+    Embeddings for text already stored are reused. Only one batch of vectors
+    is held in memory at once. Returns the number of chunks stored.
+    """
+    from pymongo import ReplaceOne
+    from pymongo.errors import BulkWriteError
+
+    collection = get_collection()
+    stats = stats if stats is not None else {"embedded": 0, "embed_seconds": 0.0}
+    documents = chunk_documents(text_chunks)
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+
+        # Identical text (a moved or re-saved PDF) keeps its existing vector
+        known = {
+            doc["text_hash"]: doc["embedding"]
+            for doc in collection.find(
+                {"text_hash": {"$in": [doc["text_hash"] for doc in batch]}},
+                {"text_hash": 1, "embedding": 1}
+            )
+        }
+        missing = list(dict.fromkeys(doc["text"] for doc in batch if doc["text_hash"] not in known))
+        if missing:
+            started = time.perf_counter()
+            with span("ingest.embed"):
+                vectors = get_embedding_model().embed_documents(missing)  # One batched forward pass
+            stats["embed_seconds"] += time.perf_counter() - started
+            stats["embedded"] += len(missing)
+            known.update(zip((text_hash(text) for text in missing), vectors))
+        for document in batch:
+            document["embedding"] = known[document["text_hash"]]
+
+        try:
+            with span("ingest.mongo"):
+                collection.bulk_write(
+                    [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch],
+                    ordered=False
+                )
+        except BulkWriteError as e:
+            print("⚠️ Bulk write error:", e.details)  # Print error details
+        if writer is not None:
+            writer.append(
+                [doc["_id"] for doc in batch],
+                [doc["embedding"] for doc in batch],
+                [doc["text"] for doc in batch]
+            )
+    return len(documents)
+
+def ingest_directory(directory=pdfs_directory, batch_size=EMBED_BATCH_SIZE, workers=None):
+    """Brings Mongo and the embedding store in line with the PDFs in `directory`."""
+    from pdf_loader import INGEST_WORKERS, iter_chunked_pages, list_pdfs
+
+    collection = get_collection()
+    manifest = load_manifest()
+    collection.create_index("text_hash")
+    collection.create_index("source")
+
+    removed = 0
+    if manifest.get("embedding_model") != EMBEDDING_MODEL_NAME:
+        # Vectors from another model are not comparable: start over
+        removed += collection.delete_many({}).deleted_count
+        manifest = {"embedding_model": EMBEDDING_MODEL_NAME, "files": {}}
+    if not manifest["files"]:
+        # Chunks written before ingestion was incremental carry no source
+        removed += collection.delete_many({"source": {"$exists": False}}).deleted_count
+
+    on_disk = list_pdfs(directory)
+    for file_path in set(manifest["files"]) - set(on_disk):
+        stale = manifest["files"].pop(file_path)["chunks"]
+        removed += collection.delete_many({"_id": {"$in": stale}}).deleted_count
+        print(f"🗑️ Removed {len(stale)} chunks from deleted file {file_path}")
+    if removed:
+        bump_generation(collection)
+
+    workers = workers or INGEST_WORKERS
+    changed = {}
+    for file_path in on_disk:
+        digest = file_hash(file_path)
+        entry = manifest["files"].get(file_path)
+        if not entry or entry["sha256"] != digest:
+            changed[file_path] = digest
+
+    # Pages stream in from the parsing pool and are embedded in full batches.
+    # Only chunk ids are kept per file; a file's manifest entry is final once
+    # every chunk it produced has been flushed. The manifest is saved after
+    # every flush, with files still streaming recorded as partial entries (no
+    # sha256), so a run that dies midway is resumed without re-appending the
+    # chunks it already stored.
+    writer = EmbeddingStoreWriter()
+    stats = {"embedded": 0, "embed_seconds": 0.0}
+    inserted = 0
+    seen = {}  # file -> {chunk_id: None}, in chunk order
+    fresh = {}  # file -> number of chunks that needed storing
+    buffer = []
+    finished = []
+
+    def flush():
+        nonlocal inserted, removed
+        changes = inserted + removed
+        inserted += store_in_mongo(buffer, writer, batch_size, stats)
+        buffer.clear()
+        for file_path in finished:
+            chunk_ids = list(seen.pop(file_path, {}))
+            entry = manifest["files"].get(file_path)
+            stale = list(set(entry["chunks"]) - set(chunk_ids)) if entry else []
+            if stale:
+                removed += collection.delete_many({"_id": {"$in": stale}}).deleted_count
+            manifest["files"][file_path] = {"sha256": changed[file_path], "chunks": chunk_ids}
+            print(f"📄 {file_path}: {fresh.pop(file_path, 0)} new chunks, {len(stale)} removed")
+        finished.clear()
+        if inserted + removed != changes:
+            # Replaced chunks can leave the count as it was: readers key on this instead
+            bump_generation(collection)
+        for file_path, ids in seen.items():
+            # Previous chunks stay listed too, so they are still cleaned up if they went stale
+            manifest["files"][file_path] = {"sha256": None, "chunks": list(dict.fromkeys([*ids, *old[file_path]]))}
+        save_manifest(manifest)
+
+    old = {}  # file -> chunk ids from the previous run
+    started = time.perf_counter()
+    for file_path, page_chunks in iter_chunked_pages(changed, workers):
+        if page_chunks is None:
+            finished.append(file_path)
+        else:
+            ids = seen.setdefault(file_path, {})
+            if file_path not in old:
+                entry = manifest["files"].get(file_path)
+                old[file_path] = set(entry["chunks"]) if entry else set()
+            old_ids = old[file_path]
+            for chunk in page_chunks:
+                doc_id = chunk_id(chunk.metadata.get("source", ""), chunk.page_content)
+                if doc_id not in ids and doc_id not in old_ids:
+                    buffer.append(chunk)
+                    fresh[file_path] = fresh.get(file_path, 0) + 1
+                ids[doc_id] = None
+        if len(buffer) >= batch_size or (finished and not buffer):
+            flush()
+    flush()
+    elapsed = time.perf_counter() - started
+
+    # New batches were appended to the memory-mapped store as they landed.
+    # The store is append-only, so any removal means rewriting it from Mongo,
+    # as does a row count off from Mongo's (a crash between the two writes).
+    if removed or EmbeddingStore(STORE_DIR).count != collection.count_documents({}):
+        rebuild_from_collection(collection)
+    # New chunks are tokenized into the BM25 index now rather than on the first query
+    lexical = get_lexical_index(EmbeddingStore(STORE_DIR))
+    print(f"✅ Ingestion complete: {inserted} chunks added, {removed} removed.")
+    print(f"🔤 Lexical index covers {lexical.size} chunks ({len(lexical.vocab)} terms).")
+    if stats["embedded"]:
+        print(
+            f"⚡ Embedded {stats['embedded']} chunks at {stats['embedded'] / stats['embed_seconds']:.1f} chunks/sec "
+            f"({stats['embedded'] / elapsed:.1f} chunks/sec end to end, batch size {batch_size}, {workers} workers)"
+        )
+
+if __name__ == "__main__":
+    import argparse
+
+    from pdf_loader import INGEST_WORKERS
+
+    parser = argparse.ArgumentParser(description="Sync MongoDB and the embedding store with the PDFs on disk.")
+    parser.add_argument("directory", nargs="?", default=pdfs_directory)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding batch")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="PDF parsing processes")
+    args = parser.parse_args()
+    ingest_directory(args.directory, args.batch_size, args.workers)
@@ -0,0 +1,131 @@
+import os
+import threading
+
+import numpy as np
+
+from embedding_store import normalize
+from quantization import get_codes, rerank_search
+
+# ======================
+# 🗂️ Persistent ANN Index
+# ======================
+# Small corpora are searched exactly straight off the memory-mapped embedding
+# store. Once the store is large enough for a full scan to hurt, a FAISS HNSW
+# graph over the same rows is saved next to the store and loaded once per
+# process. FAISS row numbers are store row numbers, so no id mapping is kept.
+# faiss itself is only imported once a graph is actually needed.
+
+INDEX_FILE = "index-{generation}.faiss"  # One graph per store generation
+
+HNSW_MIN_VECTORS = 10_000  # Smaller corpora are scanned exactly
+HNSW_NEIGHBORS = 32
+HNSW_EF_CONSTRUCTION = 40
+HNSW_EF_SEARCH = 64
+SYNC_BATCH_SIZE = 50_000
+
+
+class VectorIndex:
+    """Inner-product HNSW index whose rows line up with the embedding store."""
+
+    def __init__(self, index, generation=0, directory=None):
+        self.index = index
+        self.generation = generation
+        self.directory = directory  # Store the graph belongs to
+        self.lock = threading.Lock()
+
+    @classmethod
+    def create(cls, dim, generation=0, directory=None):
+        import faiss
+
+        index = faiss.IndexHNSWFlat(dim, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return cls(index, generation, directory)
+
+    @property
+    def size(self):
+        return self.index.ntotal
+
+    def add(self, vectors):
+        with self.lock:
+            self.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+
+    def search(self, query, top_k=3):
+        """Returns up to `top_k` (row, score) pairs, best first."""
+        if self.size == 0:
+            return []
+        query = normalize(query).reshape(1, -1)
+        scores, rows = self.index.search(query, min(top_k, self.size))
+        return [(int(row), float(score)) for row, score in zip(rows[0], scores[0]) if row >= 0]
+
+    def save(self, directory):
+        import faiss
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, INDEX_FILE.format(generation=self.generation))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with self.lock:
+            faiss.write_index(self.index, tmp)
+        os.replace(tmp, path)
+        # Graphs for earlier generations of the store are dead weight
+        for name in os.listdir(directory):
+            if name.startswith("index-") and name.endswith(".faiss") and os.path.join(directory, name) != path:
+                os.remove(os.path.join(directory, name))
+
+    @classmethod
+    def load(cls, generation, directory):
+        path = os.path.join(directory, INDEX_FILE.format(generation=generation))
+        if not os.path.exists(path):
+            return None
+        import faiss
+
+        index = faiss.read_index(path)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return cls(index, generation, directory)
+
+
+def sync_index(index, store, batch_size=SYNC_BATCH_SIZE):
+    """Adds store rows the index has not seen yet; returns True if anything changed."""
+    if index.size == store.count:
+        return False
+    for start in range(index.size, store.count, batch_size):
+        index.add(store.matrix[start:start + batch_size])
+    return True
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(store):
+    """Loads the on-disk HNSW graph once per process and keeps it level with the store.
+
+    Returns None while the store is small enough to scan exactly.
+    """
+    global _index
+    if store.count < HNSW_MIN_VECTORS:
+        return None
+    with _index_lock:
+        if _index is None or (_index.directory, _index.generation) != (store.directory, store.generation):
+            _index = VectorIndex.load(store.generation, store.directory)
+        if _index is None or _index.size > store.count or _index.index.d != store.dim:
+            print("🔄 Rebuilding vector index from the embedding store...")
+            _index = VectorIndex.create(store.dim, store.generation, store.directory)
+        if sync_index(_index, store):
+            _index.save(store.directory)
+        return _index
+
+
+def search(store, query, top_k=3):
+    """Top-k (row, score) pairs from the HNSW graph, or an exact scan for small corpora.
+
+    With EMBEDDING_QUANTIZATION on, a quantized scan plus full-precision re-rank
+    is used instead, since the graph would hold every vector in RAM again.
+    """
+    codes = get_codes(store)
+    if codes is not None:
+        return rerank_search(codes, store, query, top_k)
+    index = get_index(store)
+    if index is None:
+        return store.search(query, top_k)
+    return index.search(query, top_k)
@@ -0,0 +1,412 @@
+import functools
+import os
+import threading
+
+import numpy as np
+
+from embedding_store import STORE_DIR, SYNC_BATCH_SIZE, EmbeddingStoreWriter, get_store, normalize, replace_store, store_lock, top_k_rows
+from vector_database import bump_generation, collection_generation
+from vector_index import search as search_rows
+
+# ======================
+# 🧭 Vector Store Backends
+# ======================
+# One interface in front of every way the app can answer "which chunks are
+# closest to this vector". Backends hold (chunk_id, embedding, text) rows and
+# answer with (chunk_id, score, text) hits, best first. Vectors and queries
+# are L2-normalized, so every score is cosine similarity. VECTOR_BACKEND picks
+# the one retrieval uses:
+#
+#   mmap   the memory-mapped embedding store (+ HNSW once large); default
+#   numpy  exact search over an in-process matrix
+#   faiss  a FAISS index built with VECTOR_FAISS_FACTORY (HNSW32, Flat, ...)
+#   mongo  MongoDB Atlas `$vectorSearch` on the ingestion collection
+#
+# numpy and faiss are loaded from the embedding store, so none of them scan
+# Mongo, and follow it like mmap does: rows a later ingestion appended are
+# added on the next search, and a rebuilt store is reloaded.
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "mmap")
+VECTOR_FAISS_FACTORY = os.getenv("VECTOR_FAISS_FACTORY", "HNSW32")
+VECTOR_SEARCH_INDEX = os.getenv("VECTOR_SEARCH_INDEX", "vector_index")  # Atlas search index name
+NUM_CANDIDATES_PER_RESULT = 20  # $vectorSearch candidate pool, per requested hit
+FAISS_EF_SEARCH = 64
+FAISS_COMPACT_RATIO = 0.25  # Rebuild once this share of FAISS rows are tombstones
+
+
+class VectorStore:
+    """Interface shared by every backend."""
+
+    source = None  # The embedding store an in-process backend was loaded from
+    synced = None  # (generation, count) of `source` when it was last loaded
+    synced_at = 0  # Local `generation` right after that load
+
+    @classmethod
+    def from_store(cls, store, batch_size=SYNC_BATCH_SIZE, **kwargs):
+        """A backend holding a copy of the embedding store's rows, kept in step by `sync`."""
+        vector_store = cls(store.dim, **kwargs)
+        vector_store.source, vector_store.sync_lock = store, threading.Lock()
+        vector_store.sync(batch_size)
+        return vector_store
+
+    def sync(self, batch_size=SYNC_BATCH_SIZE):
+        """Catches up with `source` after an ingestion run, as `MmapVectorStore` does by refreshing."""
+        if self.source is None:
+            return
+        self.source.refresh()
+        with self.sync_lock:
+            store = self.source
+            generation, count = store.generation, store.count
+            if (generation, count) == self.synced:
+                return
+            if self.synced is None:
+                target, start = self, 0
+            elif self.synced[0] == generation and self.synced[1] <= count:
+                target, start = self, self.synced[1]  # Same generation: the store only grew
+            else:
+                target, start = self.empty(store.dim), 0  # Rebuilt: load it beside the old rows
+            for begin in range(start, count, batch_size):
+                rows = range(begin, min(begin + batch_size, count))
+                target.add([store.chunk_id(row) for row in rows], store.matrix[begin:rows.stop],
+                           [store.text(row) for row in rows])
+            if target is not self:
+                with self.lock:
+                    # Swap everything but the lock; the local generation keeps counting up
+                    state = {name: value for name, value in vars(target).items() if name != "lock"}
+                    state["generation"] = self.generation + 1
+                    vars(self).update(state)
+            self.synced, self.synced_at = (generation, count), self.generation
+
+    def empty(self, dim):
+        """A new, empty backend configured like this one."""
+        raise NotImplementedError
+
+    def snapshot_version(self):
+        """`version` of an in-process backend: the source's "generation:count", as for mmap, plus local edits.
+
+        Result caches can live on disk and be shared between processes, so a
+        bare local counter (1 in every fresh process) won't do.
+        """
+        self.sync()
+        if self.source is None:
+            return f"{os.getpid()}-{id(self)}:{self.generation}"  # Rows that only ever lived in this process
+        with self.sync_lock:
+            return f"{self.synced[0]}:{self.synced[1]}+{self.generation - self.synced_at}"
+
+    def add(self, ids, embeddings, texts):
+        """Inserts rows; an id that is already present is replaced."""
+        raise NotImplementedError
+
+    def delete(self, ids):
+        """Removes rows by chunk id; unknown ids are ignored."""
+        raise NotImplementedError
+
+    def search(self, query, top_k=3):
+        """Up to `top_k` (chunk_id, score, text) hits, best first."""
+        raise NotImplementedError
+
+    def batch_search(self, queries, top_k=3):
+        return [self.search(query, top_k) for query in queries]
+
+    @property
+    def count(self):
+        raise NotImplementedError
+
+    @property
+    def version(self):
+        """Changes whenever the rows do; used to key result caches."""
+        raise NotImplementedError
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact inner-product search over a float32 matrix held in this process."""
+
+    def __init__(self, dim=0):
+        self.buffer = np.zeros((0, dim), dtype=np.float32)  # Grows by doubling; rows past count are unused
+        self.ids = []
+        self.texts = []
+        self.rows = {}  # chunk id -> row
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def empty(self, dim):
+        return NumpyVectorStore(dim)
+
+    @property
+    def matrix(self):
+        return self.buffer[:len(self.ids)]
+
+    def add(self, ids, embeddings, texts):
+        embeddings = normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        with self.lock:
+            self._delete([chunk_id for chunk_id in ids if chunk_id in self.rows])
+            start, end = len(self.ids), len(self.ids) + len(ids)
+            if end > len(self.buffer) or self.buffer.shape[1] != embeddings.shape[1]:
+                buffer = np.zeros((max(end, 2 * len(self.buffer)), embeddings.shape[1]), dtype=np.float32)
+                buffer[:start] = self.buffer[:start]
+                self.buffer = buffer
+            self.buffer[start:end] = embeddings
+            self.ids.extend(ids)
+            self.texts.extend(texts)
+            self.rows.update((chunk_id, start + n) for n, chunk_id in enumerate(ids))
+            self.generation += 1
+
+    def delete(self, ids):
+        with self.lock:
+            self._delete(ids)
+            self.generation += 1
+
+    def _delete(self, ids):
+        drop = {self.rows[chunk_id] for chunk_id in ids if chunk_id in self.rows}
+        if not drop:
+            return
+        keep = [row for row in range(len(self.ids)) if row not in drop]
+        self.buffer = self.buffer[keep]
+        self.ids = [self.ids[row] for row in keep]
+        self.texts = [self.texts[row] for row in keep]
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+
+    def search(self, query, top_k=3):
+        return self.batch_search([query], top_k)[0]
+
+    def batch_search(self, queries, top_k=3):
+        self.sync()
+        matrix, ids, texts = self.matrix, self.ids, self.texts
+        if not ids:
+            return [[] for _ in queries]
+        scores = normalize(np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)) @ matrix.T
+        return [
+            [(ids[row], float(query_scores[row]), texts[row]) for row in top_k_rows(query_scores, top_k)]
+            for query_scores in scores
+        ]
+
+    @property
+    def count(self):
+        self.sync()
+        return len(self.ids)
+
+    @property
+    def version(self):
+        return self.snapshot_version()
+
+
+class FaissVectorStore(VectorStore):
+    """Any FAISS index_factory index. Deletes are tombstones, filtered inside the search."""
+
+    def __init__(self, dim, factory=VECTOR_FAISS_FACTORY):
+        import faiss
+
+        self.dim = dim
+        self.factory = factory
+        self.index = faiss.index_factory(dim, factory, faiss.METRIC_INNER_PRODUCT)
+        self.ids = []  # FAISS position -> chunk id
+        self.texts = []
+        self.positions = {}  # live chunk id -> FAISS position
+        self.tombstones = set()
+        self.selector = None
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, factory=VECTOR_FAISS_FACTORY, batch_size=SYNC_BATCH_SIZE):
+        return super().from_store(store, batch_size, factory=factory)
+
+    def empty(self, dim):
+        return FaissVectorStore(dim, self.factory)
+
+    def add(self, ids, embeddings, texts):
+        embeddings = np.ascontiguousarray(normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dim)))
+        with self.lock:
+            self._tombstone([chunk_id for chunk_id in ids if chunk_id in self.positions])
+            if not self.index.is_trained:
+                self.index.train(embeddings)  # IVF/PQ factories learn from the first batch
+            start = len(self.ids)
+            self.index.add(embeddings)
+            self.ids.extend(ids)
+            self.texts.extend(texts)
+            self.positions.update((chunk_id, start + n) for n, chunk_id in enumerate(ids))
+            self.generation += 1
+
+    def delete(self, ids):
+        with self.lock:
+            self._tombstone(ids)
+            if len(self.tombstones) > FAISS_COMPACT_RATIO * max(len(self.ids), 1):
+                self._compact()
+            self.generation += 1
+
+    def _tombstone(self, ids):
+        import faiss
+
+        dead = [self.positions.pop(chunk_id) for chunk_id in ids if chunk_id in self.positions]
+        if not dead:
+            return
+        self.tombstones.update(dead)
+        batch = faiss.IDSelectorBatch(np.fromiter(self.tombstones, dtype=np.int64))
+        self.selector = (faiss.IDSelectorNot(batch), batch)  # The Not only borrows the batch
+
+    def _compact(self):
+        import faiss
+
+        live = sorted(self.positions.values())
+        vectors = self.index.reconstruct_batch(np.asarray(live, dtype=np.int64)) if live else None
+        ids, texts = [self.ids[p] for p in live], [self.texts[p] for p in live]
+        self.index = faiss.index_factory(self.dim, self.factory, faiss.METRIC_INNER_PRODUCT)
+        self.ids, self.texts, self.positions, self.tombstones, self.selector = [], [], {}, set(), None
+        if live:
+            if not self.index.is_trained:
+                self.index.train(vectors)
+            self.index.add(vectors)
+            self.ids, self.texts = ids, texts
+            self.positions = {chunk_id: position for position, chunk_id in enumerate(ids)}
+
+    def _params(self):
+        import faiss
+
+        sel = self.selector[0] if self.selector else None
+        if "HNSW" in self.factory:
+            return faiss.SearchParametersHNSW(sel=sel, efSearch=FAISS_EF_SEARCH)
+        return faiss.SearchParameters(sel=sel) if sel else None
+
+    def search(self, query, top_k=3):
+        return self.batch_search([query], top_k)[0]
+
+    def batch_search(self, queries, top_k=3):
+        self.sync()
+        queries = np.ascontiguousarray(normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)))
+        with self.lock:
+            if not self.positions:
+                return [[] for _ in queries]
+            scores, positions = self.index.search(queries, min(top_k, len(self.positions)), params=self._params())
+            return [
+                [(self.ids[p], float(s), self.texts[p]) for p, s in zip(row_positions, row_scores) if p >= 0]
+                for row_positions, row_scores in zip(positions, scores)
+            ]
+
+    @property
+    def count(self):
+        self.sync()
+        return len(self.positions)
+
+    @property
+    def version(self):
+        return self.snapshot_version()
+
+
+class MmapVectorStore(VectorStore):
+    """The memory-mapped embedding store, searched exactly or through its HNSW graph."""
+
+    def __init__(self, store):
+        self.store = store
+
+    @property
+    def directory(self):
+        return self.store.directory
+
+    def add(self, ids, embeddings, texts):
+        EmbeddingStoreWriter(self.directory, self.store.dtype.name).append(ids, embeddings, texts)
+        self.store.refresh()
+
+    def delete(self, ids):
+        # The store is append-only: rewrite it without the deleted rows, under
+        # the lock so no append lands in between. Readers keep mapping the
+        # replaced files until they refresh.
+        with store_lock(self.directory):
+            self.store.refresh()
+            old, drop = self.store, set(ids)
+            keep = [row for row in range(old.count) if old.chunk_id(row) not in drop]
+            if len(keep) == old.count:
+                return
+            matrix, chunk_ids, texts = old.matrix, [old.chunk_id(row) for row in keep], [old.text(row) for row in keep]
+            batches = (
+                (chunk_ids[start:start + SYNC_BATCH_SIZE], matrix[keep[start:start + SYNC_BATCH_SIZE]],
+                 texts[start:start + SYNC_BATCH_SIZE])
+                for start in range(0, len(keep), SYNC_BATCH_SIZE)
+            )
+            replace_store(self.directory, batches, old.dtype.name)
+        self.store.refresh()
+
+    def search(self, query, top_k=3):
+        self.store.refresh()
+        return [(self.store.chunk_id(row), score, self.store.text(row)) for row, score in search_rows(self.store, query, top_k)]
+
+    @property
+    def count(self):
+        self.store.refresh()
+        return self.store.count
+
+    @property
+    def version(self):
+        self.store.refresh()
+        return f"{self.store.generation}:{self.store.count}"
+
+
+class MongoVectorStore(VectorStore):
+    """Server-side search with Atlas `$vectorSearch`.
+
+    Needs a vector search index on `embedding` with "cosine" similarity, so
+    scores match the normalized backends without rewriting stored vectors.
+    """
+
+    def __init__(self, collection, index_name=VECTOR_SEARCH_INDEX):
+        self.collection = collection
+        self.index_name = index_name
+
+    def add(self, ids, embeddings, texts):
+        from pymongo import ReplaceOne
+
+        self.collection.bulk_write([
+            ReplaceOne({"_id": chunk_id}, {"_id": chunk_id, "text": text, "embedding": list(map(float, vector))},
+                       upsert=True)
+            for chunk_id, vector, text in zip(ids, embeddings, texts)
+        ], ordered=False)
+        bump_generation(self.collection)
+
+    def delete(self, ids):
+        self.collection.delete_many({"_id": {"$in": list(ids)}})
+        bump_generation(self.collection)
+
+    def search(self, query, top_k=3, filter=None):
+        """`filter` is an MQL pre-filter on fields indexed as filters, e.g. {"source": ...}."""
+        stage = {
+            "index": self.index_name,
+            "path": "embedding",
+            "queryVector": [float(x) for x in query],
+            "numCandidates": top_k * NUM_CANDIDATES_PER_RESULT,
+            "limit": top_k,
+        }
+        if filter:
+            stage["filter"] = filter
+        pipeline = [
+            {"$vectorSearch": stage},
+            {"$project": {"text": 1, "score": {"$meta": "vectorSearchScore"}}},
+        ]
+        return [(doc["_id"], doc["score"], doc["text"]) for doc in self.collection.aggregate(pipeline)]
+
+    @property
+    def count(self):
+        return self.collection.estimated_document_count()
+
+    @property
+    def version(self):
+        # The count alone misses re-ingested files whose chunks were replaced one for one
+        return f"{collection_generation(self.collection)}:{self.count}"
+
+
+BACKENDS = ("mmap", "numpy", "faiss", "mongo")
+
+
+@functools.lru_cache(maxsize=None)
+def get_vector_store(backend=VECTOR_BACKEND):
+    """The process-wide store retrieval runs against."""
+    from vector_database import get_collection
+
+    if backend == "mongo":
+        return MongoVectorStore(get_collection())
+    store = get_store(get_collection(), STORE_DIR)
+    if backend == "mmap":
+        return MmapVectorStore(store)
+    if backend == "numpy":
+        return NumpyVectorStore.from_store(store)
+    if backend == "faiss":
+        return FaissVectorStore.from_store(store)
+    raise ValueError(f"Unknown vector backend {backend!r}, expected one of {BACKENDS}")